@@ -0,0 +1,269 @@
+"""Archival of processed admissions and old contact messages.
+
+Approved/rejected admissions older than ARCHIVE_ADMISSIONS_AFTER_DAYS and
+contact messages older than ARCHIVE_CONTACTS_AFTER_DAYS are moved, in
+batches, into `admissions_archive` and `contacts_archive`. The hot
+collections that the admin lists, search and dashboard read then hold only
+recent and still-pending data. List routes take `?include_archived=true`
+to read both tiers, and the dashboard counters follow the hot collections.
+
+Each batch is copied into the archive before it is deleted from the hot
+collection, and both steps skip what is already done, so a run that dies
+part way is finished by the next one. With ARCHIVE_ENABLED=true every
+worker schedules runs, but a lease in `archive_runs` lets one at a time
+proceed. Restored documents are stamped `restored_at` and are not archived
+again. From the command line:
+
+    python archive.py --run
+    python archive.py --restore admissions --id <id> [--id <id> ...]
+    python archive.py --restore contacts --since 2024-01-01 [--until 2024-06-30]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from stats import record_admissions, record_contacts
+from write_queue import insert_ignoring_duplicates
+
+logger = logging.getLogger(__name__)
+
+# Archiver configuration
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "false").lower() == "true"
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", str(6 * 3600)))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_ADMISSIONS_AFTER_DAYS = int(os.getenv("ARCHIVE_ADMISSIONS_AFTER_DAYS", "365"))
+ARCHIVE_CONTACTS_AFTER_DAYS = int(os.getenv("ARCHIVE_CONTACTS_AFTER_DAYS", "180"))
+ARCHIVE_LEASE_SECONDS = 15 * 60
+
+ARCHIVE_SUFFIX = "_archive"
+LEASE_ID = "archiver"
+
+
+@dataclass
+class ArchivePolicy:
+    """Which documents of a collection are cold"""
+    collection: str
+    date_field: str
+    after_days: int
+    statuses: Optional[List[str]] = None
+
+    def query(self, now: datetime) -> dict:
+        query = {
+            self.date_field: {"$lt": now - timedelta(days=self.after_days)},
+            # Restored documents were brought back on purpose; never re-archive them
+            "restored_at": {"$exists": False},
+        }
+        if self.statuses:
+            query["status"] = {"$in": self.statuses}
+        return query
+
+
+ARCHIVE_POLICIES = {
+    "admissions": ArchivePolicy("admissions", "submitted_at", ARCHIVE_ADMISSIONS_AFTER_DAYS, ["approved", "rejected"]),
+    "contacts": ArchivePolicy("contacts", "created_at", ARCHIVE_CONTACTS_AFTER_DAYS),
+}
+
+# Dashboard counter hooks, applied with delta=-1 when archiving and 1 when restoring
+COUNTER_HOOKS = {
+    "admissions": record_admissions,
+    "contacts": record_contacts,
+}
+
+
+def archive_name(collection: str) -> str:
+    return collection + ARCHIVE_SUFFIX
+
+
+async def _move(db, source: str, target: str, docs: List[dict], query: dict) -> List[dict]:
+    """Copy docs into `target`, then delete those still matching `query` from `source`.
+
+    Returns the documents that left `source`. A document that stopped
+    matching in between (e.g. its status changed) stays in `source`, and its
+    copy is removed from `target` again.
+    """
+    await insert_ignoring_duplicates(db[target], docs)
+    ids = [doc["id"] for doc in docs]
+    await db[source].delete_many({**query, "id": {"$in": ids}})
+
+    kept = {doc["id"] for doc in await db[source].find({"id": {"$in": ids}}, {"_id": 0, "id": 1}).to_list(None)}
+    if kept:
+        await db[target].delete_many({"id": {"$in": list(kept)}})
+    return [doc for doc in docs if doc["id"] not in kept]
+
+
+class LeaseLost(Exception):
+    """Another worker took over the archival lease during a run"""
+
+
+async def archive_collection(
+    db, policy: ArchivePolicy, batch_size: int = ARCHIVE_BATCH_SIZE, owner: Optional[str] = None
+) -> int:
+    """Move every cold document of one collection into its archive; returns the count.
+
+    With `owner`, the archival lease is renewed after each batch and
+    LeaseLost is raised if it has passed to someone else.
+    """
+    query = policy.query(datetime.utcnow())
+    moved = 0
+    while True:
+        docs = await db[policy.collection].find(query).sort(policy.date_field, 1).limit(batch_size).to_list(None)
+        if not docs:
+            return moved
+        archived_at = datetime.utcnow()
+        for doc in docs:
+            doc["archived_at"] = archived_at
+        left = await _move(db, policy.collection, archive_name(policy.collection), docs, query)
+        await COUNTER_HOOKS[policy.collection](db, left, -1)
+        moved += len(left)
+        if owner is not None and not await _acquire_lease(db, owner):
+            raise LeaseLost(owner)
+
+
+async def restore(db, collection: str, query: dict, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Move archived documents matching `query` back into the hot collection"""
+    moved = 0
+    while True:
+        docs = await db[archive_name(collection)].find(query).limit(batch_size).to_list(None)
+        if not docs:
+            return moved
+        restored_at = datetime.utcnow()
+        for doc in docs:
+            doc.pop("archived_at", None)
+            doc["restored_at"] = restored_at
+        # The hot copy is written first, so a crash leaves it in both tiers, never neither
+        inserted = await insert_ignoring_duplicates(db[collection], docs)
+        await db[archive_name(collection)].delete_many({"id": {"$in": [doc["id"] for doc in docs]}})
+        await COUNTER_HOOKS[collection](db, inserted, 1)
+        moved += len(inserted)
+
+
+async def _acquire_lease(db, owner: str) -> bool:
+    now = datetime.utcnow()
+    try:
+        await db.archive_runs.update_one(
+            {"_id": LEASE_ID, "$or": [{"expires_at": {"$lt": now}}, {"owner": owner}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ARCHIVE_LEASE_SECONDS)}},
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        return False  # held by another worker
+
+
+async def run_archival(db, owner: Optional[str] = None) -> Optional[Dict[str, int]]:
+    """Archive every policy's cold documents, or return None if another run holds the lease"""
+    owner = owner or uuid.uuid4().hex
+    if not await _acquire_lease(db, owner):
+        return None
+    try:
+        moved = {}
+        for name, policy in ARCHIVE_POLICIES.items():
+            moved[name] = await archive_collection(db, policy, owner=owner)
+            if moved[name]:
+                logger.info("Archived %d %s", moved[name], name)
+        await db.archive_runs.update_one(
+            {"_id": LEASE_ID}, {"$set": {"last_run_at": datetime.utcnow(), "last_moved": moved}}
+        )
+        return moved
+    except LeaseLost:
+        logger.warning("Archival lease expired and was taken over; stopping this run")
+        return None
+    finally:
+        await db.archive_runs.update_one(
+            {"_id": LEASE_ID, "owner": owner}, {"$set": {"expires_at": datetime.utcnow()}}
+        )
+
+
+class Archiver:
+    """Runs archival every ARCHIVE_INTERVAL_SECONDS in the background"""
+
+    def __init__(self, db, enabled: bool = ARCHIVE_ENABLED):
+        self.db = db
+        self.enabled = enabled
+        self.owner = uuid.uuid4().hex
+        self._task = None
+
+    def start(self):
+        if self.enabled:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await run_archival(self.db, self.owner)
+            except Exception:
+                logger.exception("Archival run failed")
+            await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+def _date(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Archive cold admissions/contacts or restore them")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--run", action="store_true", help="archive everything past the configured ages now")
+    action.add_argument("--restore", choices=sorted(ARCHIVE_POLICIES), help="move archived documents back")
+    parser.add_argument("--id", action="append", dest="ids", default=[], help="restore this id (repeatable)")
+    parser.add_argument("--since", type=_date, help="restore documents dated on or after YYYY-MM-DD")
+    parser.add_argument("--until", type=_date, help="restore documents dated before YYYY-MM-DD")
+    args = parser.parse_args(argv)
+    if args.restore and not (args.ids or args.since or args.until):
+        parser.error("--restore needs --id, --since or --until")
+    return args
+
+
+async def main(argv: List[str]) -> int:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    args = parse_args(argv)
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    try:
+        if args.run:
+            moved = await run_archival(db)
+            if moved is None:
+                print("✗ Another archival run is in progress")
+                return 1
+            print(f"✓ Archived {', '.join(f'{count} {name}' for name, count in moved.items())}")
+            return 0
+
+        query = {}
+        if args.ids:
+            query["id"] = {"$in": args.ids}
+        date_field = ARCHIVE_POLICIES[args.restore].date_field
+        if args.since or args.until:
+            query[date_field] = {}
+            if args.since:
+                query[date_field]["$gte"] = args.since
+            if args.until:
+                query[date_field]["$lt"] = args.until
+        count = await restore(db, args.restore, query)
+        print(f"✓ Restored {count} {args.restore}")
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -1,49 +1,275 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from functools import lru_cache
+from typing import Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import asyncio
+import hashlib
+import logging
 import os
+import threading
+import time
+
+from metrics import JWT_CACHE, JWT_VERIFY_SECONDS
+from profiling import record
+
+logger = logging.getLogger(__name__)
 
 # Security configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+# Embed name/phone/id in the token so /auth/me needs no database read
+JWT_PROFILE_CLAIMS = os.getenv("JWT_PROFILE_CLAIMS", "true").lower() == "true"
+PROFILE_CLAIMS = ("uid", "name", "phone", "created_at")
+# How often each worker pulls revocations made through the other workers
+TOKEN_REVOCATION_SYNC_SECONDS = float(os.getenv("TOKEN_REVOCATION_SYNC_SECONDS", "2"))
+REVOCATION_SYNC_OVERLAP = timedelta(seconds=60)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+# passlib and python-jose (with its cryptography backend) are imported on
+# first use rather than at import, keeping them off worker startup.
+
+@lru_cache(maxsize=None)
+def pwd_context():
+    """The shared CryptContext, built on first use.
+
+    Hashes made with a different cost factor verify fine but report
+    needs_update, so they are rehashed on the next successful login.
+    """
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password, returning a replacement hash if the stored one is outdated"""
+    return pwd_context().verify_and_update(plain_password, hashed_password)
+
+class VerifiedTokenCache:
+    """Bounded LRU of decoded tokens keyed by a hash of the token.
+
+    Entries are dropped once the token's `exp` passes, so a cache hit never
+    outlives what `jwt.decode` would have accepted.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                return None
+            if payload.get("exp", 0) <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def put(self, key: str, payload: dict):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class TokenRevocations:
+    """Per-subject cutoffs: tokens issued before a cutoff are rejected.
+
+    `revoke` is called when a user is deleted; `mark_profile_changed` makes
+    tokens with embedded profile claims fall back to a database read.
+    Cutoffs are kept in the `token_revocations` collection, and every worker
+    pulls new ones each TOKEN_REVOCATION_SYNC_SECONDS, so a change made on
+    one worker reaches the others within that interval. Cutoffs older than
+    the token lifetime can no longer match; they are pruned here and expired
+    by a TTL index in Mongo.
+    """
+
+    def __init__(self, collection: str = "token_revocations"):
+        self.collection = collection
+        self.db = None
+        self._revoked = {}
+        self._profile_changed = {}
+        self._lock = threading.Lock()
+        self._synced_at = None
+        self._task = None
+
+    async def start(self, db):
+        self.db = db
+        await db[self.collection].create_index("expires_at", expireAfterSeconds=0)
+        await self.sync()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(TOKEN_REVOCATION_SYNC_SECONDS)
+            try:
+                await self.sync()
+            except Exception:
+                logger.exception("Token revocation sync failed")
+
+    async def sync(self):
+        """Pull the cutoffs written since the last sync, by any worker"""
+        query = {}
+        if self._synced_at is not None:
+            # The overlap absorbs clock differences between workers
+            query["updated_at"] = {"$gte": self._synced_at - REVOCATION_SYNC_OVERLAP}
+        started = datetime.utcnow()
+        docs = await self.db[self.collection].find(query).to_list(None)
+        now = time.time()
+        with self._lock:
+            for entries, field in ((self._revoked, "revoked_at"), (self._profile_changed, "profile_changed_at")):
+                for doc in docs:
+                    if field in doc:
+                        entries[doc["_id"]] = max(entries.get(doc["_id"], 0), doc[field])
+                self._prune(entries, now)
+        self._synced_at = started
+
+    async def _store(self, subject: str, field: str, cutoff: float):
+        if self.db is None:
+            return
+        now = datetime.utcnow()
+        await self.db[self.collection].update_one(
+            {"_id": subject},
+            {
+                "$max": {field: cutoff},
+                "$set": {"updated_at": now, "expires_at": now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)},
+            },
+            upsert=True,
+        )
+
+    def _prune(self, entries: dict, now: float):
+        horizon = now - ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        for subject in [s for s, t in entries.items() if t < horizon]:
+            del entries[subject]
+
+    async def revoke(self, subject: str):
+        now = time.time()
+        with self._lock:
+            self._prune(self._revoked, now)
+            self._revoked[subject] = now
+        await self._store(subject, "revoked_at", now)
+
+    async def mark_profile_changed(self, subject: str):
+        now = time.time()
+        with self._lock:
+            self._prune(self._profile_changed, now)
+            self._profile_changed[subject] = now
+        await self._store(subject, "profile_changed_at", now)
+
+    def is_revoked(self, payload: dict) -> bool:
+        cutoff = self._revoked.get(payload.get("sub"))
+        return cutoff is not None and payload.get("iat", 0) < cutoff
+
+    def profile_is_current(self, payload: dict) -> bool:
+        changed = self._profile_changed.get(payload.get("sub"))
+        return changed is None or payload.get("iat", 0) >= changed
+
+
+token_cache = VerifiedTokenCache(TOKEN_CACHE_SIZE)
+token_revocations = TokenRevocations()
+
+def token_claims(user: dict) -> dict:
+    """Build the JWT claims for a user document or model dict"""
+    claims = {"sub": user["email"], "role": user["role"]}
+    if JWT_PROFILE_CLAIMS:
+        created_at = user.get("created_at")
+        claims.update(
+            uid=user["id"],
+            name=user["name"],
+            phone=user["phone"],
+            created_at=created_at.isoformat() if isinstance(created_at, datetime) else created_at,
+        )
+    return claims
+
+def profile_from_claims(payload: dict) -> Optional[dict]:
+    """Rebuild the user profile from token claims, if present and still current"""
+    if not all(claim in payload for claim in PROFILE_CLAIMS):
+        return None
+    if not token_revocations.profile_is_current(payload):
+        return None
+    return {
+        "id": payload["uid"],
+        "email": payload["sub"],
+        "name": payload["name"],
+        "phone": payload["phone"],
+        "role": payload["role"],
+        "created_at": payload["created_at"],
+    }
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
+    now = datetime.utcnow()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+        expire = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire, "iat": now})
+    from jose import jwt
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def _credentials_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
 def verify_token(token: str) -> dict:
-    """Verify and decode a JWT token"""
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    """Verify and decode a JWT token, using the verified-token cache"""
+    key = token_cache.key(token)
+    payload = token_cache.get(key)
+    if payload is None:
+        from jose import JWTError, jwt
+        JWT_CACHE.inc("miss")
+        started = time.perf_counter()
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise _credentials_error()
+        finally:
+            elapsed = time.perf_counter() - started
+            JWT_VERIFY_SECONDS.observe(elapsed)
+            record("jwt", elapsed)
+        token_cache.put(key, payload)
+    else:
+        JWT_CACHE.inc("hit")
+
+    if token_revocations.is_revoked(payload):
+        raise _credentials_error()
+    return payload
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """Dependency to get the current user from token"""
@@ -65,3 +291,13 @@ async def get_current_admin(current_user: dict = Depends(get_current_user)) -> d
             detail="Not authorized to access this resource",
         )
     return current_user
+
+def is_admin_authorization(authorization: bytes) -> bool:
+    """Whether a raw Authorization header carries a valid admin token"""
+    scheme, _, token = authorization.decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        return verify_token(token).get("role") == "admin"
+    except HTTPException:
+        return False
@@ -0,0 +1,67 @@
+"""Throughput of one update_one per admission vs bulk_update_status.
+
+    python -m benchmarks.bulk_writes [--sizes 10,1000,10000] [--mongomock]
+
+The per-item path mirrors the admin UI calling
+PUT /api/admissions/{id}/status once per application.
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from bulk import bulk_update_status
+from models import AdmissionBulkStatusUpdate, AdmissionStatusItem
+from seed_db import generate
+from benchmarks.mongo import connect
+
+
+async def _reset(collection, size: int) -> List[str]:
+    await collection.drop()
+    docs = generate("admissions", size)
+    for doc in docs:
+        doc["status"] = "pending"
+    await collection.insert_many(docs)
+    await collection.create_index("id", unique=True)
+    return [doc["id"] for doc in docs]
+
+
+async def per_item(collection, ids: List[str]):
+    for admission_id in ids:
+        await collection.update_one({"id": admission_id}, {"$set": {"status": "approved"}})
+
+
+async def bulk(collection, ids: List[str]):
+    request = AdmissionBulkStatusUpdate(
+        updates=[AdmissionStatusItem(id=admission_id, status="approved") for admission_id in ids]
+    )
+    await bulk_update_status(collection, request)
+
+
+async def run(sizes: List[int], use_mock: bool):
+    client, db = connect(use_mock)
+    collection = db.admissions
+    print(f"{'updates':>8} {'per-item ops/s':>15} {'bulk ops/s':>11} {'speedup':>8}")
+    try:
+        for size in sizes:
+            timings = {}
+            for name, path in (("per_item", per_item), ("bulk", bulk)):
+                ids = await _reset(collection, size)
+                started = time.perf_counter()
+                await path(collection, ids)
+                timings[name] = time.perf_counter() - started
+            print(
+                f"{size:>8} {size / timings['per_item']:>15.0f} "
+                f"{size / timings['bulk']:>11.0f} {timings['per_item'] / timings['bulk']:>7.1f}x"
+            )
+    finally:
+        await collection.drop()
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,1000,10000")
+    parser.add_argument("--mongomock", action="store_true", help="Use mongomock-motor instead of MONGO_URL")
+    args = parser.parse_args()
+    asyncio.run(run([int(n) for n in args.sizes.split(",")], args.mongomock))
@@ -0,0 +1,354 @@
+"""Scripted traffic against the whole app, in process, with JSON baselines.
+
+    python -m benchmarks.load_test [--scenario homepage] [--concurrency 50]
+        [--duration 10] [--scale 1.0] [--mongomock] [--save-baseline | --compare]
+
+The FastAPI app from server.py is started with its lifespan (indexes,
+caches, write-behind queue) and driven through httpx's ASGI transport, so
+every middleware and route runs but no sockets or uvicorn are involved.
+The scratch database (DB_NAME + "_bench") is dropped and reseeded first.
+
+Each scenario runs `--concurrency` virtual users for `--duration` seconds,
+each picking requests from a weighted mix. Throughput and p50/p95/p99 are
+reported per route. `--save-baseline` writes them to
+benchmarks/baselines/load_test-<mongod|mongomock>.json; `--compare` reruns
+and exits non-zero if a route's p95 or throughput regressed by more than
+`--tolerance` against that file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from seed_db import FIRST_NAMES, GRADES, Distribution, generate
+from benchmarks.mongo import connect
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+INSERT_BATCH_SIZE = 5000
+BENCH_PASSWORD = "benchmark-password"
+ADMIN_EMAIL = "bench-admin@example.com"
+
+# Documents per collection at --scale 1.0
+SEED_COUNTS = {
+    "users": 5000,
+    "admissions": 20000,
+    "contacts": 10000,
+    "gallery": 200,
+    "announcements": 50,
+}
+
+
+@dataclass
+class Call:
+    """One scripted request; `route` is the label results are grouped by"""
+    route: str
+    method: str
+    path: str
+    json: Optional[dict] = None
+    admin: bool = False
+
+
+class Traffic:
+    """Request builders shared by the scenarios; ids come from the seed data"""
+
+    def __init__(self, rng: random.Random, seeded: Dict[str, list]):
+        self.rng = rng
+        self.user_emails = [doc["email"] for doc in seeded["users"]]
+        self.admission_ids = [doc["id"] for doc in seeded["admissions"]]
+        self.submissions = 0
+
+    def gallery(self):
+        return Call("GET /api/gallery", "GET", "/api/gallery?limit=24")
+
+    def announcements(self):
+        return Call("GET /api/announcements", "GET", "/api/announcements?limit=10")
+
+    def root(self):
+        return Call("GET /api/", "GET", "/api/")
+
+    def login(self):
+        return Call("POST /api/auth/login", "POST", "/api/auth/login", {
+            "email": self.rng.choice(self.user_emails), "password": BENCH_PASSWORD,
+        })
+
+    def dashboard(self):
+        return Call("GET /api/admin/dashboard", "GET", "/api/admin/dashboard", admin=True)
+
+    def admissions_page(self):
+        order = self.rng.choice(["asc", "desc"])
+        return Call("GET /api/admissions", "GET", f"/api/admissions?limit=50&order={order}", admin=True)
+
+    def admission_search(self):
+        q = self.rng.choice(FIRST_NAMES)[:self.rng.randrange(2, 5)]
+        return Call("GET /api/admissions/search", "GET", f"/api/admissions/search?q={q}&status=pending", admin=True)
+
+    def admission_detail(self):
+        admission_id = self.rng.choice(self.admission_ids)
+        return Call("GET /api/admissions/{admission_id}", "GET", f"/api/admissions/{admission_id}", admin=True)
+
+    def admission_review(self):
+        admission_id = self.rng.choice(self.admission_ids)
+        return Call(
+            "PUT /api/admissions/{admission_id}/status", "PUT", f"/api/admissions/{admission_id}/status",
+            {"status": self.rng.choice(["approved", "rejected"])}, admin=True,
+        )
+
+    def contacts_page(self):
+        return Call("GET /api/contact", "GET", "/api/contact?limit=50", admin=True)
+
+    def admission_form(self):
+        self.submissions += 1
+        return Call("POST /api/admissions", "POST", "/api/admissions", {
+            "student_name": "Bench Student",
+            "parent_name": "Bench Parent",
+            "email": f"spike{self.submissions}@example.com",
+            "phone": "+91 9876543210",
+            "grade": self.rng.choice(GRADES),
+            "dob": "2015-06-01",
+            "address": "1 MG Road, Pune",
+        })
+
+    def contact_form(self):
+        self.submissions += 1
+        return Call("POST /api/contact", "POST", "/api/contact", {
+            "name": "Bench Visitor",
+            "email": f"spike{self.submissions}@example.com",
+            "phone": "+91 9876543210",
+            "subject": "Admission enquiry",
+            "message": "Please share the fee structure.",
+        })
+
+
+# Weighted request mixes, as (weight, Traffic method name)
+SCENARIOS = {
+    "homepage": [(45, "gallery"), (45, "announcements"), (10, "root")],
+    "login_burst": [(100, "login")],
+    "admin_review": [
+        (10, "dashboard"), (25, "admissions_page"), (20, "admission_search"),
+        (20, "admission_detail"), (15, "admission_review"), (10, "contacts_page"),
+    ],
+    "form_spike": [(60, "admission_form"), (40, "contact_form")],
+}
+
+
+def _percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _configure_environment(db_name: str, rate_limit: bool, use_mock: bool):
+    """Point server.py at the scratch database; must run before importing it"""
+    os.environ["DB_NAME"] = db_name
+    if use_mock:
+        # Collection-backed stores would otherwise reach for a real server
+        os.environ["RESPONSE_CACHE_BACKEND"] = "memory"
+        os.environ["RATE_LIMIT_BACKEND"] = "memory"
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ["RATE_LIMIT_ENABLED"] = "true" if rate_limit else "false"
+    os.environ["WRITE_JOURNAL_DIR"] = tempfile.mkdtemp(prefix="bench-journal-")
+    os.environ["MEDIA_ROOT"] = tempfile.mkdtemp(prefix="bench-media-")
+
+
+async def _seed(db, scale: float) -> Dict[str, list]:
+    from auth import get_password_hash
+    from search import with_search_terms
+
+    # One real hash shared by every user, so logins verify without seeding cost
+    password_hash = get_password_hash(BENCH_PASSWORD)
+    dist = Distribution(password_hash=password_hash)
+    seeded = {}
+    for collection, base_count in SEED_COUNTS.items():
+        docs = generate(collection, max(1, int(base_count * scale)), dist=dist)
+        if collection in ("admissions", "contacts"):
+            docs = [with_search_terms(doc, collection) for doc in docs]
+        await db[collection].drop()
+        for start in range(0, len(docs), INSERT_BATCH_SIZE):
+            await db[collection].insert_many(docs[start:start + INSERT_BATCH_SIZE], ordered=False)
+        seeded[collection] = docs
+
+    await db.users.insert_one({
+        "id": "bench-admin", "email": ADMIN_EMAIL, "password": password_hash,
+        "name": "Bench Admin", "phone": "+91 1234567890", "role": "admin",
+        "created_at": datetime.utcnow(),
+    })
+    return seeded
+
+
+async def _virtual_user(http, pick: Callable[[], Call], admin_headers: dict, deadline: float, samples: dict):
+    while time.perf_counter() < deadline:
+        call = pick()
+        started = time.perf_counter()
+        response = await http.request(
+            call.method, call.path, json=call.json,
+            headers=admin_headers if call.admin else None,
+        )
+        elapsed = time.perf_counter() - started
+        timings, errors = samples.setdefault(call.route, ([], [0]))
+        timings.append(elapsed)
+        if response.status_code >= 400:
+            errors[0] += 1
+
+
+async def run_scenario(http, traffic: Traffic, name: str, concurrency: int, duration: float, admin_headers: dict) -> dict:
+    weights, methods = zip(*SCENARIOS[name])
+    builders = [getattr(traffic, method) for method in methods]
+
+    def pick() -> Call:
+        return traffic.rng.choices(builders, weights)[0]()
+
+    samples: Dict[str, tuple] = {}
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        _virtual_user(http, pick, admin_headers, deadline, samples) for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+
+    routes = {}
+    for route, (timings, errors) in sorted(samples.items()):
+        routes[route] = {
+            "requests": len(timings),
+            "errors": errors[0],
+            "throughput_rps": round(len(timings) / elapsed, 1),
+            "p50_ms": round(_percentile(timings, 0.50) * 1000, 2),
+            "p95_ms": round(_percentile(timings, 0.95) * 1000, 2),
+            "p99_ms": round(_percentile(timings, 0.99) * 1000, 2),
+        }
+    total = sum(route["requests"] for route in routes.values())
+    return {
+        "requests": total,
+        "errors": sum(route["errors"] for route in routes.values()),
+        "throughput_rps": round(total / elapsed, 1),
+        "routes": routes,
+    }
+
+
+def _print_results(name: str, result: dict):
+    print(f"\n{name}: {result['requests']} requests, {result['throughput_rps']} req/s, {result['errors']} errors")
+    print(f"  {'route':<42} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for route, r in result["routes"].items():
+        print(f"  {route:<42} {r['throughput_rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['errors']:>7}")
+
+
+def compare(baseline: dict, results: dict, tolerance: float) -> List[str]:
+    """Routes whose p95 or throughput moved past `tolerance` the wrong way"""
+    regressions = []
+    for name, result in results.items():
+        base_routes = baseline.get("scenarios", {}).get(name, {}).get("routes", {})
+        for route, current in result["routes"].items():
+            base = base_routes.get(route)
+            if base is None:
+                continue
+            if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{name} {route}: p95 {base['p95_ms']} -> {current['p95_ms']} ms")
+            if current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+                regressions.append(
+                    f"{name} {route}: throughput {base['throughput_rps']} -> {current['throughput_rps']} req/s"
+                )
+    return regressions
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(args) -> dict:
+    bench_client, bench_db = connect(args.mongomock)
+    _configure_environment(bench_db.name, args.rate_limit, args.mongomock)
+
+    import httpx
+    import server
+
+    # Connect ahead of the lifespan so the database can be seeded first;
+    # the lifespan's own connect() is then a no-op
+    if args.mongomock:
+        server.database.connect(bench_client)
+    else:
+        bench_client.close()
+        server.database.connect()
+
+    app = server.app
+    results = {}
+    # Seed before startup so ensure_indexes builds on the fresh collections
+    seeded = await _seed(server.db, args.scale)
+    async with app.router.lifespan_context(app):
+        traffic = Traffic(random.Random(args.seed), seeded)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            response = await http.post("/api/admin/login", json={"email": ADMIN_EMAIL, "password": BENCH_PASSWORD})
+            response.raise_for_status()
+            admin_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+            for name in names:
+                results[name] = await run_scenario(
+                    http, traffic, name, args.concurrency, args.duration, admin_headers
+                )
+                _print_results(name, results[name])
+
+    return {
+        "recorded_at": datetime.utcnow().isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "backend": "mongomock" if args.mongomock else "mongod",
+        "settings": {
+            "concurrency": args.concurrency, "duration": args.duration,
+            "scale": args.scale, "seed": args.seed, "rate_limit": args.rate_limit,
+        },
+        "scenarios": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=["all"] + list(SCENARIOS), default="all")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for SEED_COUNTS")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mongomock", action="store_true", help="use mongomock-motor instead of MONGO_URL")
+    parser.add_argument("--rate-limit", action="store_true", help="keep RateLimitMiddleware enabled")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--save-baseline", action="store_true")
+    mode.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression as a fraction")
+    args = parser.parse_args()
+
+    baseline_path = BASELINE_DIR / f"load_test-{'mongomock' if args.mongomock else 'mongod'}.json"
+    if args.compare and not baseline_path.exists():
+        sys.exit(f"No baseline at {baseline_path}; run with --save-baseline first")
+
+    report = asyncio.run(run(args))
+
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nSaved baseline to {baseline_path}")
+    elif args.compare:
+        baseline = json.loads(baseline_path.read_text())
+        regressions = compare(baseline, report["scenarios"], args.tolerance)
+        print(f"\nCompared with baseline from {baseline['git_revision']} ({baseline['recorded_at']})")
+        for regression in regressions:
+            print(f"  REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("  no regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""Database handles for benchmarks: a real mongod or an in-memory mongomock"""
+import os
+from pathlib import Path
+
+BENCH_DB_SUFFIX = "_bench"
+
+
+def connect(use_mock: bool = False):
+    """Return (client, db) for a scratch database.
+
+    With `use_mock`, mongomock-motor is used so no server is needed; the
+    numbers then measure Python overhead only, not Mongo round trips.
+    Otherwise MONGO_URL from backend/.env is used with DB_NAME + "_bench".
+    """
+    if use_mock:
+        from mongomock_motor import AsyncMongoMockClient
+        client = AsyncMongoMockClient()
+    else:
+        from dotenv import load_dotenv
+        from motor.motor_asyncio import AsyncIOMotorClient
+        load_dotenv(Path(__file__).parent.parent / '.env')
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db_name = os.environ.get('DB_NAME', 'gurukul') + BENCH_DB_SUFFIX
+    return client, client[db_name]
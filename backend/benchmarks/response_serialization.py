@@ -0,0 +1,83 @@
+"""Compare the model-rebuild response path with serialization.dumps.
+
+    python -m benchmarks.response_serialization [--sizes 1000,10000,100000] [--repeat 3]
+
+The legacy path is what list routes did before: rebuild a model per
+document (users also copy the dict to drop `password`), then FastAPI's
+response_model handling dumps, re-validates and JSON-encodes the list.
+The fast path encodes documents fetched with the route's projection.
+"""
+import argparse
+import json
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+
+from models import User, Admission, Contact, Gallery, Announcement
+from serialization import dumps, PUBLIC_PROJECTION, USER_PROJECTION
+from seed_db import generate
+
+CASES = [
+    ("users", User, USER_PROJECTION),
+    ("admissions", Admission, PUBLIC_PROJECTION),
+    ("contacts", Contact, PUBLIC_PROJECTION),
+    ("gallery", Gallery, PUBLIC_PROJECTION),
+    ("announcements", Announcement, PUBLIC_PROJECTION),
+]
+
+
+def legacy_path(docs: list, model, adapter: TypeAdapter) -> bytes:
+    if model is User:
+        objs = [User(**{k: v for k, v in doc.items() if k != "password"}) for doc in docs]
+    else:
+        objs = [model(**doc) for doc in docs]
+    # fastapi.routing.serialize_response for a List[model] response_model
+    content = [obj.model_dump() for obj in objs]
+    value = adapter.validate_python(content)
+    return json.dumps(
+        adapter.dump_python(value, mode="json"),
+        ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def fast_path(docs: list) -> bytes:
+    return dumps(docs)
+
+
+def project(docs: list, projection: dict) -> list:
+    """Apply an exclusion projection the way Mongo would before the route sees it"""
+    excluded = [k for k, v in projection.items() if v == 0]
+    return [{k: v for k, v in doc.items() if k not in excluded} for doc in docs]
+
+
+def best_of(repeat: int, func, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run(sizes: List[int], repeat: int):
+    print(f"{'collection':<14} {'docs':>8} {'legacy ms':>11} {'fast ms':>9} {'speedup':>8}")
+    for collection, model, projection in CASES:
+        adapter = TypeAdapter(List[model])
+        for size in sizes:
+            raw = generate(collection, size)
+            projected = project(raw, projection)
+            legacy = best_of(repeat, legacy_path, raw, model, adapter)
+            fast = best_of(repeat, fast_path, projected)
+            print(
+                f"{collection:<14} {size:>8} {legacy * 1000:>11.1f} "
+                f"{fast * 1000:>9.1f} {legacy / fast:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run([int(n) for n in args.sizes.split(",")], args.repeat)
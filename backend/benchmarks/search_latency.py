@@ -0,0 +1,72 @@
+"""Latency of search.search against a seeded admissions collection.
+
+    python -m benchmarks.search_latency [--docs 100000] [--queries 200] [--mongomock]
+
+Reports p50/p95/p99 per query shape; the target is under 50 ms at 100k.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from indexes import INDEXES
+from search import SearchParams, search, with_search_terms
+from seed_db import FIRST_NAMES, LAST_NAMES, GRADES, generate
+from benchmarks.mongo import connect
+
+INSERT_BATCH_SIZE = 5000
+
+
+def _queries(rng: random.Random):
+    return {
+        "full name": lambda: f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "name prefix": lambda: rng.choice(FIRST_NAMES)[:3],
+        "email prefix": lambda: f"parent{rng.randrange(1000)}",
+        "grade + filter": lambda: rng.choice(GRADES),
+    }
+
+
+def _percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def run(docs: int, queries: int, use_mock: bool):
+    client, db = connect(use_mock)
+    collection = db.admissions
+    try:
+        await collection.drop()
+        generated = generate("admissions", docs)
+        for start in range(0, docs, INSERT_BATCH_SIZE):
+            batch = generated[start:start + INSERT_BATCH_SIZE]
+            await collection.insert_many([with_search_terms(doc, "admissions") for doc in batch])
+        await collection.create_indexes(INDEXES["admissions"])
+
+        rng = random.Random(1)
+        print(f"{'query':<16} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'avg hits':>9}")
+        for label, make_query in _queries(rng).items():
+            timings, hits = [], []
+            for _ in range(queries):
+                params = SearchParams(q=make_query(), page=1, limit=20)
+                filters = {"status": "pending"} if label == "grade + filter" else None
+                started = time.perf_counter()
+                result = await search(collection, "admissions", params, filters)
+                timings.append((time.perf_counter() - started) * 1000)
+                hits.append(result["total"])
+            print(
+                f"{label:<16} {_percentile(timings, 0.5):>8.1f} {_percentile(timings, 0.95):>8.1f} "
+                f"{_percentile(timings, 0.99):>8.1f} {statistics.mean(hits):>9.0f}"
+            )
+    finally:
+        await collection.drop()
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--mongomock", action="store_true", help="Use mongomock-motor instead of MONGO_URL")
+    args = parser.parse_args()
+    asyncio.run(run(args.docs, args.queries, args.mongomock))
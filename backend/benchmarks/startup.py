@@ -0,0 +1,168 @@
+"""Worker startup time: imports, app construction and the first request.
+
+    python -m benchmarks.startup [--runs 5] [--budget 1.5] [--routers all]
+        [--mongomock] [--top 15]
+
+Each run spawns a fresh interpreter that imports server.py, calls
+create_app(), runs the lifespan startup and answers GET /api/ through the
+ASGI interface (no sockets), the way a new uvicorn worker would. The wall
+time from spawn to that response is the time-to-first-request; the run
+fails (exit 1) when the median exceeds `--budget` seconds.
+
+One extra run with `python -X importtime` lists the slowest imports by
+cumulative time, to show which dependency to defer when the budget is
+exceeded.
+
+Measured baseline with --mongomock (all routers): median 0.97-1.13s to
+the first request, of which importing fastapi is 0.4-0.6s and pymongo
+about 0.2s; app construction and lifespan take under 0.1s together.
+Those imports are needed before the first request can be served, so the
+default budget leaves headroom above that baseline rather than below it.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from benchmarks.mongo import BENCH_DB_SUFFIX
+
+BACKEND_DIR = Path(__file__).parent.parent
+STARTUP_BUDGET_SECONDS = 1.5
+
+
+def _environment(use_mock: bool) -> Dict[str, str]:
+    """Environment for the child interpreters, pointed at scratch storage"""
+    env = dict(os.environ)
+    env["DB_NAME"] = env.get("DB_NAME", "gurukul") + BENCH_DB_SUFFIX
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    if use_mock:
+        env["RESPONSE_CACHE_BACKEND"] = "memory"
+        env["RATE_LIMIT_BACKEND"] = "memory"
+    env["WRITE_JOURNAL_DIR"] = tempfile.mkdtemp(prefix="bench-journal-")
+    env["MEDIA_ROOT"] = tempfile.mkdtemp(prefix="bench-media-")
+    return env
+
+
+async def _first_request(app) -> int:
+    """Send GET /api/ straight through the ASGI interface and return the status"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/api/", "raw_path": b"/api/",
+        "root_path": "", "query_string": b"", "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+
+async def _child(routers: str, use_mock: bool):
+    """Runs inside the spawned interpreter; prints one JSON line of phase timings"""
+    started = time.perf_counter()
+    import server
+    imported = time.perf_counter()
+
+    app = server.create_app(routers)
+    built = time.perf_counter()
+    if use_mock:
+        from mongomock_motor import AsyncMongoMockClient
+        server.database.connect(AsyncMongoMockClient())
+
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        status = await _first_request(app)
+        answered = time.perf_counter()
+        print(json.dumps({
+            "status": status,
+            "import_s": imported - started,
+            "create_app_s": built - imported,
+            "lifespan_s": ready - built,
+            "request_s": answered - ready,
+        }), flush=True)
+
+
+def _spawn(env: Dict[str, str], routers: str, use_mock: bool) -> dict:
+    command = [sys.executable, "-m", "benchmarks.startup", "--child", "--routers", routers]
+    if use_mock:
+        command.append("--mongomock")
+    spawned = time.perf_counter()
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, text=True)
+    # The line is printed once the response is in; shutdown is not timed
+    line = process.stdout.readline()
+    first_request = time.perf_counter() - spawned
+    process.communicate()
+    if not line:
+        raise RuntimeError(f"startup child exited with {process.returncode}")
+    phases = json.loads(line)
+    if phases["status"] != 200:
+        raise RuntimeError(f"GET /api/ answered {phases['status']}")
+    phases["first_request_s"] = first_request
+    return phases
+
+
+def slowest_imports(env: Dict[str, str], top: int) -> List[Tuple[int, str]]:
+    """(cumulative microseconds, module) for the slowest top-level imports of server.py"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nesting shows as indentation; depth 1 is what server.py pulls in directly
+        if len(name) - len(name.lstrip()) <= 3:
+            imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_SECONDS, help="seconds to first request")
+    parser.add_argument("--routers", default="all", help="API_ROUTERS subset to build")
+    parser.add_argument("--mongomock", action="store_true", help="use mongomock-motor instead of MONGO_URL")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(_child(args.routers, args.mongomock))
+        return
+
+    env = _environment(args.mongomock)
+    runs = [_spawn(env, args.routers, args.mongomock) for _ in range(args.runs)]
+
+    print(f"{'phase':<18} {'median ms':>10} {'max ms':>10}")
+    for phase in ("import_s", "create_app_s", "lifespan_s", "request_s", "first_request_s"):
+        values = [run[phase] for run in runs]
+        print(f"{phase[:-2]:<18} {statistics.median(values) * 1000:>10.1f} {max(values) * 1000:>10.1f}")
+
+    print("\nslowest imports (cumulative ms):")
+    for cumulative, name in slowest_imports(env, args.top):
+        print(f"  {cumulative / 1000:>8.1f}  {name}")
+
+    median = statistics.median(run["first_request_s"] for run in runs)
+    if median > args.budget:
+        print(f"\n✗ time to first request {median:.3f}s exceeds the {args.budget:.3f}s budget")
+        sys.exit(1)
+    print(f"\n✓ time to first request {median:.3f}s within the {args.budget:.3f}s budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Batched admin writes: many status updates or deletes per request.
+
+Each call reads the current state of the targeted ids once, applies all
+changes in a single bulk_write/delete_many, and reports a per-item result.
+Status updates only apply to admissions still in the status that was read;
+one changed concurrently is reported as `conflict` and left as it is.
+
+When a concurrent request got to some of the targeted documents first, the
+bulk result cannot say which changes were ours. Callers then recount the
+dashboard counters rather than apply deltas that may already be applied.
+"""
+import os
+from typing import List, Tuple
+
+from fastapi import HTTPException, status
+from pymongo import UpdateOne
+
+from models import AdmissionBulkStatusUpdate, BulkItemResult, BulkResult
+
+# Largest number of items accepted in one bulk request
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "10000"))
+
+
+def _check_size(count: int):
+    if count == 0:
+        raise HTTPException(status_code=400, detail="No items given")
+    if count > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MAX_ITEMS} items per request"
+        )
+
+
+async def bulk_update_status(collection, request: AdmissionBulkStatusUpdate) -> Tuple[BulkResult, List[dict]]:
+    """Apply admission status changes, returning the result and the
+    transitions made as {"id", "from", "to"} dicts.
+
+    Transitions are empty when they cannot be attributed: in filter mode, or
+    when a concurrent change made fewer operations apply than planned.
+    """
+    if request.filter is not None:
+        criteria = request.filter.dict(exclude_none=True)
+        if not criteria or not request.status:
+            raise HTTPException(status_code=400, detail="A filter update needs criteria and a status")
+        query = {"$and": [criteria, {"status": {"$ne": request.status}}]}
+        result = await collection.update_many(query, {"$set": {"status": request.status}})
+        return BulkResult(matched=result.matched_count, modified=result.modified_count), []
+
+    # Later entries win when an id is repeated
+    updates = {item.id: item.status for item in request.updates}
+    _check_size(len(updates))
+
+    existing = await collection.find(
+        {"id": {"$in": list(updates)}}, {"_id": 0, "id": 1, "status": 1}
+    ).to_list(None)
+    current = {doc["id"]: doc.get("status") for doc in existing}
+
+    operations, planned, results = [], {}, {}
+    for admission_id, new_status in updates.items():
+        if admission_id not in current:
+            results[admission_id] = "not_found"
+        elif current[admission_id] == new_status:
+            results[admission_id] = "unchanged"
+        else:
+            # Only applies if nobody changed the status since the read above
+            operations.append(UpdateOne(
+                {"id": admission_id, "status": current[admission_id]}, {"$set": {"status": new_status}}
+            ))
+            planned[admission_id] = new_status
+            results[admission_id] = "updated"
+
+    modified = 0
+    if operations:
+        result = await collection.bulk_write(operations, ordered=False)
+        modified = result.modified_count
+        if modified < len(operations):
+            # Another writer moved some of these; ids not at our value certainly
+            # conflicted, but those that are may have been moved there by it
+            now = await collection.find(
+                {"id": {"$in": list(planned)}}, {"_id": 0, "id": 1, "status": 1}
+            ).to_list(None)
+            settled = {doc["id"] for doc in now if doc.get("status") == planned[doc["id"]]}
+            for admission_id in planned:
+                if admission_id not in settled:
+                    results[admission_id] = "conflict"
+            planned = {}
+
+    transitions = [
+        {"id": admission_id, "from": current[admission_id], "to": new_status}
+        for admission_id, new_status in planned.items()
+    ]
+    items = [BulkItemResult(id=admission_id, result=outcome) for admission_id, outcome in results.items()]
+    return BulkResult(matched=len(current), modified=modified, results=items), transitions
+
+
+async def bulk_delete(collection, ids: List[str], fields=()) -> Tuple[BulkResult, List[dict]]:
+    """Delete documents by id, returning the result and the matched
+    documents (their `id` plus any requested `fields`).
+
+    All matched documents are gone afterwards, but when `result.modified`
+    is below their count a concurrent request deleted some of them, and
+    callers must not count them as their own deletions.
+    """
+    ids = list(dict.fromkeys(ids))
+    _check_size(len(ids))
+
+    projection = {"_id": 0, "id": 1, **{field: 1 for field in fields}}
+    existing = await collection.find({"id": {"$in": ids}}, projection).to_list(None)
+    found = {doc["id"] for doc in existing}
+
+    deleted = 0
+    if found:
+        result = await collection.delete_many({"id": {"$in": list(found)}})
+        deleted = result.deleted_count
+
+    results = [
+        BulkItemResult(id=item_id, result="deleted" if item_id in found else "not_found")
+        for item_id in ids
+    ]
+    return BulkResult(matched=len(found), modified=deleted, results=results), existing
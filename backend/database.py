@@ -0,0 +1,124 @@
+"""Motor client lifecycle, pool configuration and health checks.
+
+The client is created per worker inside the app's lifespan rather than at
+import time, so gunicorn/uvicorn workers forked after import never share
+a client and its sockets. Modules keep a `DatabaseProxy` from import time
+and it resolves to the live database on each access.
+
+Connections are budgeted across workers: unless MONGO_MAX_POOL_SIZE is
+set, each worker gets MONGO_CONNECTION_BUDGET / WEB_CONCURRENCY, so adding
+workers does not multiply the connections Mongo has to hold open.
+Public GET routes read through `public_db`, which uses
+MONGO_PUBLIC_READ_PREFERENCE (primary by default). Their responses are
+cached until the next write invalidates them, so a secondary mode can pin
+a page that misses that write; only set one (e.g. secondaryPreferred)
+where a stale gallery or announcements list is acceptable.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import read_pref_mode_from_name, make_read_preference
+
+from metrics import command_timer, pool_monitor
+
+logger = logging.getLogger(__name__)
+
+# Pool configuration
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+MONGO_CONNECTION_BUDGET = int(os.getenv("MONGO_CONNECTION_BUDGET", "100"))
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE") or max(5, MONGO_CONNECTION_BUDGET // WEB_CONCURRENCY))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+MONGO_PUBLIC_READ_PREFERENCE = os.getenv("MONGO_PUBLIC_READ_PREFERENCE", "primary")
+# Secondaries further behind than this are skipped for public reads (min 90)
+MONGO_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_MAX_STALENESS_SECONDS", "-1"))
+HEALTH_TIMEOUT = float(os.getenv("HEALTH_TIMEOUT_SECONDS", "2"))
+
+
+def client_options() -> dict:
+    return {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "event_listeners": [command_timer, pool_monitor],
+    }
+
+
+class Database:
+    """One worker's Motor client plus the database handles routes use"""
+
+    def __init__(self, url: str, name: str):
+        self.url = url
+        self.name = name
+        self.client: Optional[AsyncIOMotorClient] = None
+        self.db = None
+        self.public_db = None
+        self._owns_client = False
+
+    @property
+    def connected(self) -> bool:
+        return self.client is not None
+
+    def connect(self, client: Optional[AsyncIOMotorClient] = None):
+        """Create this worker's client, or adopt `client` (benchmarks pass a mock)"""
+        if self.client is not None:
+            return
+        self._owns_client = client is None
+        self.client = client or AsyncIOMotorClient(self.url, **client_options())
+        self.db = self.client[self.name]
+        mode = read_pref_mode_from_name(MONGO_PUBLIC_READ_PREFERENCE)
+        self.public_db = self.client.get_database(
+            self.name, read_preference=make_read_preference(mode, None, MONGO_MAX_STALENESS_SECONDS)
+        )
+        logger.info("Mongo client created (pid %d, maxPoolSize %d)", os.getpid(), MONGO_MAX_POOL_SIZE)
+
+    def close(self):
+        if self.client is not None and self._owns_client:
+            self.client.close()
+        self.client = self.db = self.public_db = None
+
+    async def ping(self) -> dict:
+        """Round trip to the primary; raises on timeout or connection failure"""
+        started = time.perf_counter()
+        await asyncio.wait_for(self.db.command("ping"), timeout=HEALTH_TIMEOUT)
+        return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+    async def health(self) -> dict:
+        if not self.connected:
+            return {"ok": False, "error": "not connected"}
+        try:
+            return await self.ping()
+        except Exception as exc:
+            return {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+
+
+class DatabaseProxy:
+    """Stand-in for a Motor database that resolves to the live one on access"""
+
+    def __init__(self, database: Database, attribute: str = "db"):
+        self._database = database
+        self._attribute = attribute
+
+    def _target(self):
+        target = getattr(self._database, self._attribute)
+        if target is None:
+            raise RuntimeError("Database used before the app started")
+        return target
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+    def __getitem__(self, name):
+        return self._target()[name]
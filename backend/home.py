@@ -0,0 +1,106 @@
+"""Precomputed payload for GET /api/home.
+
+The homepage needs the latest gallery images, the active announcements
+and the public school figures. They are fetched together with one
+concurrent query per collection, trimmed by limits and projections, and
+encoded once. Requests are then served from that payload, with an ETag
+so an unchanged homepage costs a bodiless 304.
+
+When a write route invalidates "gallery" or "announcements" in the
+response cache, the payload is rebuilt in the background straight away.
+Other workers notice the bumped namespace versions (shared when
+RESPONSE_CACHE_BACKEND=mongo) on their next request and rebuild then.
+"""
+import asyncio
+import logging
+import os
+from typing import Optional, Tuple
+
+from fastapi import Request, Response
+
+from profiling import background_task
+from response_cache import ResponseCache, entry_response, make_entry
+from stats import SCHOOL_STATS
+
+logger = logging.getLogger(__name__)
+
+HOME_GALLERY_LIMIT = int(os.getenv("HOME_GALLERY_LIMIT", "12"))
+HOME_ANNOUNCEMENTS_LIMIT = int(os.getenv("HOME_ANNOUNCEMENTS_LIMIT", "5"))
+
+HOME_NAMESPACES = ("gallery", "announcements")
+GALLERY_FIELDS = {"_id": 0, "id": 1, "title": 1, "image_url": 1, "category": 1, "srcset": 1}
+ANNOUNCEMENT_FIELDS = {"_id": 0, "id": 1, "title": 1, "content": 1, "category": 1, "created_at": 1}
+NEWEST_FIRST = [("created_at", -1), ("id", -1)]
+
+
+class HomeBundle:
+    """One encoded homepage payload per worker, rebuilt when its sources change"""
+
+    def __init__(self, db, response_cache: ResponseCache):
+        self.db = db
+        self.response_cache = response_cache
+        self._entry: Optional[dict] = None
+        self._versions: Optional[Tuple] = None
+        self._task: Optional[asyncio.Task] = None
+        self._dirty = False
+        response_cache.on_invalidate(self._invalidated)
+
+    async def _current_versions(self) -> Tuple:
+        backend = self.response_cache.backend
+        return tuple([await backend.get_version(namespace) for namespace in HOME_NAMESPACES])
+
+    async def build(self) -> dict:
+        """Query both collections concurrently and return the payload"""
+        gallery, announcements = await asyncio.gather(
+            self.db.gallery.find({}, GALLERY_FIELDS).sort(NEWEST_FIRST)
+                .limit(HOME_GALLERY_LIMIT).to_list(HOME_GALLERY_LIMIT),
+            self.db.announcements.find({"is_active": True}, ANNOUNCEMENT_FIELDS).sort(NEWEST_FIRST)
+                .limit(HOME_ANNOUNCEMENTS_LIMIT).to_list(HOME_ANNOUNCEMENTS_LIMIT),
+        )
+        return {"gallery": gallery, "announcements": announcements, "stats": SCHOOL_STATS}
+
+    async def _rebuild(self):
+        while True:
+            self._dirty = False
+            # Versions read before the queries: a write during the build
+            # leaves them behind, so the next request rebuilds again
+            versions = await self._current_versions()
+            self._entry = make_entry(await self.build(), {})
+            self._versions = versions
+            if not self._dirty:
+                return
+
+    def refresh(self) -> asyncio.Task:
+        """Start a background rebuild, or queue one behind the running rebuild"""
+        if self._task is None or self._task.done():
+            self._task = background_task(self._rebuild())
+            self._task.add_done_callback(self._log_failure)
+        else:
+            self._dirty = True
+        return self._task
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Homepage bundle rebuild failed", exc_info=task.exception())
+
+    def _invalidated(self, namespace: str):
+        if namespace in HOME_NAMESPACES:
+            self.refresh()
+
+    async def respond(self, request: Request) -> Response:
+        cache_status = "HIT"
+        if self._entry is None or self._versions != await self._current_versions():
+            cache_status = "MISS"
+            try:
+                await asyncio.shield(self.refresh())
+            except Exception:
+                if self._entry is None:
+                    raise
+                cache_status = "STALE"  # logged by _log_failure
+        return entry_response(request, self._entry, cache_status)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
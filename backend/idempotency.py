@@ -0,0 +1,294 @@
+"""Idempotency-Key support for POST routes.
+
+A client that sends `Idempotency-Key: <unique value>` can retry a POST
+safely: the first execution's response is stored and every retry with
+the same key gets that response back (marked `Idempotent-Replayed: true`)
+without the route running again. Keys are scoped to the path and the
+caller's Authorization header, and reusing a key with a different body
+is rejected with 422.
+
+Completed responses live in the `idempotency_keys` collection, expired
+by a TTL index after IDEMPOTENCY_TTL_SECONDS, with an in-process LRU in
+front. Concurrent requests with one key share a single execution: within
+a worker they await the same future; across workers the first one claims
+the key with a pending document and the others wait for it to finish.
+Responses with a 5xx status are not stored, so those retries run again.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Store configuration
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "1000"))
+# How long a claimed key may stay in progress before another worker takes over
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "30"))
+IDEMPOTENCY_POLL_INTERVAL = 0.1
+MAX_KEY_LENGTH = 255
+# Larger bodies (uploads) are not fingerprinted, only keyed
+MAX_FINGERPRINT_BYTES = 1024 * 1024
+MAX_STORED_BODY = 1024 * 1024
+
+# Their responses carry bearer tokens, which we do not persist. Logins write
+# nothing; duplicate registrations are refused by the unique email index.
+EXCLUDED_PATHS = {"/api/auth/login", "/api/admin/login", "/api/auth/register"}
+
+KEY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class IdempotencyStore:
+    """Completed responses in Mongo (TTL) behind an in-process LRU"""
+
+    def __init__(self, db, collection: str = "idempotency_keys", cache_size: int = IDEMPOTENCY_CACHE_SIZE):
+        self.db = db
+        self.collection = collection
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        # Executions running in this worker, awaited by concurrent duplicates
+        self.in_flight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def records(self):
+        # Resolved per use: the database handle may be a proxy that connects later
+        return self.db[self.collection]
+
+    async def setup(self):
+        await self.records.create_index("expires_at", expireAfterSeconds=0)
+
+    def cached(self, key: str) -> Optional[dict]:
+        record = self._cache.get(key)
+        if record is not None:
+            self._cache.move_to_end(key)
+        return record
+
+    def _remember(self, key: str, record: dict):
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def claim(self, key: str, fingerprint: Optional[str]) -> Optional[dict]:
+        """Claim a key for execution.
+
+        Returns None when this caller should run the request, or the stored
+        record ({"state": "done", ...}) when another execution finished it.
+        """
+        now = datetime.utcnow()
+        pending = {
+            "_id": key,
+            "state": "pending",
+            "fingerprint": fingerprint,
+            "expires_at": now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+        }
+        deadline = asyncio.get_running_loop().time() + IDEMPOTENCY_LOCK_SECONDS
+        while True:
+            try:
+                await self.records.insert_one(pending)
+                return None
+            except DuplicateKeyError:
+                pass
+
+            record = await self.records.find_one({"_id": key})
+            if record is None:
+                continue  # expired between the insert and the read
+            if record["state"] == "done":
+                record = self._from_document(record)
+                self._remember(key, record)
+                return record
+            # Take over a claim whose owner died without finishing
+            taken = await self.records.update_one(
+                {"_id": key, "state": "pending", "expires_at": {"$lt": datetime.utcnow()}},
+                {"$set": pending},
+            )
+            if taken.modified_count:
+                return None
+            if asyncio.get_running_loop().time() > deadline:
+                return {"state": "pending", "fingerprint": record.get("fingerprint")}
+            await asyncio.sleep(IDEMPOTENCY_POLL_INTERVAL)
+
+    async def complete(self, key: str, fingerprint: Optional[str], response: Optional[dict]):
+        """Store the response, or release the claim when it should not be replayed"""
+        if response is None:
+            await self.records.delete_one({"_id": key, "state": "pending"})
+            return
+        record = {"state": "done", "fingerprint": fingerprint, **response}
+        self._remember(key, record)
+        await self.records.replace_one(
+            {"_id": key},
+            {**record, "expires_at": datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)},
+            upsert=True,
+        )
+
+    @staticmethod
+    def _from_document(doc: dict) -> dict:
+        return {
+            "state": "done",
+            "fingerprint": doc.get("fingerprint"),
+            "status": doc["status"],
+            "headers": doc["headers"],
+            "body": bytes(doc["body"]),
+        }
+
+
+async def _send_json(send, status_code: int, detail: str, extra_headers=()):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *extra_headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _replay(send, record: dict):
+    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in record["headers"]]
+    await send({
+        "type": "http.response.start",
+        "status": record["status"],
+        "headers": headers + [(REPLAYED_HEADER.lower().encode(), b"true")],
+    })
+    await send({"type": "http.response.body", "body": record["body"]})
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware; must sit inside CORS so stored headers are origin-neutral"""
+
+    def __init__(self, app, store: IdempotencyStore):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] in EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        client_key = headers.get(KEY_HEADER)
+        if client_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not client_key or len(client_key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+            return
+
+        # Same key from another caller or on another route is a different request
+        key = hashlib.sha256(b"\0".join([
+            scope["path"].encode(), headers.get(b"authorization", b""), client_key,
+        ])).hexdigest()
+        receive, fingerprint = await self._fingerprint(receive)
+
+        record = self.store.cached(key)
+        if record is None and key in self.store.in_flight:
+            record = await asyncio.shield(self.store.in_flight[key])
+        if record is not None:
+            await self._answer(send, record, fingerprint)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self.store.in_flight[key] = future
+        try:
+            try:
+                record = await self.store.claim(key, fingerprint)
+            except Exception:
+                # Without the store, run the request rather than fail it
+                logger.exception("Idempotency store unavailable; running %s without it", scope["path"])
+                await self.app(scope, receive, send)
+                return
+            if record is not None:
+                future.set_result(record)
+                await self._answer(send, record, fingerprint)
+                return
+
+            try:
+                response = await self._run(scope, receive, send)
+            except BaseException:
+                # Free the key now rather than leave other workers waiting out the lock
+                try:
+                    await asyncio.shield(self.store.complete(key, fingerprint, None))
+                except Exception:
+                    logger.exception("Failed to release idempotency claim for %s", scope["path"])
+                raise
+            stored = response if response is not None and response["status"] < 500 else None
+            future.set_result({"state": "done", "fingerprint": fingerprint, **stored} if stored else None)
+            try:
+                await self.store.complete(key, fingerprint, stored)
+            except Exception:
+                logger.exception("Failed to store idempotent response for %s", scope["path"])
+        finally:
+            if not future.done():
+                future.set_result(None)
+            self.store.in_flight.pop(key, None)
+
+    async def _answer(self, send, record: Optional[dict], fingerprint: Optional[str]):
+        if record is None:
+            await _send_json(send, 409, "The original request with this Idempotency-Key did not complete; retry it")
+        elif record["fingerprint"] and fingerprint and record["fingerprint"] != fingerprint:
+            await _send_json(send, 422, "Idempotency-Key was already used with a different request body")
+        elif record["state"] == "pending":
+            await _send_json(
+                send, 409, "A request with this Idempotency-Key is still in progress",
+                [(b"retry-after", b"1")],
+            )
+        else:
+            await _replay(send, record)
+
+    async def _run(self, scope, receive, send) -> Optional[dict]:
+        """Run the app, passing the response through while capturing it"""
+        response = {"status": 500, "headers": [], "body": b""}
+        chunks, size = [], 0
+
+        async def capture(message):
+            nonlocal size
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    (name.decode("latin-1"), value.decode("latin-1"))
+                    for name, value in message.get("headers", [])
+                ]
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                size += len(body)
+                if size <= MAX_STORED_BODY:
+                    chunks.append(body)
+            await send(message)
+
+        await self.app(scope, receive, capture)
+        if size > MAX_STORED_BODY:
+            return None
+        response["body"] = b"".join(chunks)
+        return response
+
+    async def _fingerprint(self, receive):
+        """Hash the request body, then replay it to the app"""
+        messages, size = [], 0
+        digest = hashlib.sha256()
+        while True:
+            message = await receive()
+            messages.append(message)
+            body = message.get("body", b"")
+            size += len(body)
+            digest.update(body)
+            if not message.get("more_body") or size > MAX_FINGERPRINT_BYTES:
+                break
+        fingerprint = digest.hexdigest() if size <= MAX_FINGERPRINT_BYTES else None
+
+        async def replay():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        return replay, fingerprint
@@ -0,0 +1,238 @@
+"""Index bootstrap and query-plan checks for the Mongo collections.
+
+Run at app startup and from seed_db.py. An existing index with the same
+keys but other options (e.g. one that predates `unique=True`) is left in
+place there and logged; dropping it is up to an operator. From the
+command line:
+
+    python indexes.py            # create any missing indexes
+    python indexes.py --replace  # also drop and rebuild conflicting ones
+    python indexes.py --check    # also explain every route query, exit 1 on COLLSCAN
+"""
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import List, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Server error codes for an index that exists under the same name/keys
+# but with different options (e.g. it predates `unique=True`).
+INDEX_CONFLICT_CODES = (85, 86)
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        # Dashboard count and keyset pagination of the user list
+        IndexModel(
+            [("role", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="role_created_at_id",
+        ),
+    ],
+    "admissions": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel(
+            [("submitted_at", DESCENDING), ("id", DESCENDING)],
+            name="submitted_at_id",
+        ),
+        IndexModel(
+            [("status", ASCENDING), ("submitted_at", DESCENDING)],
+            name="status_submitted_at",
+        ),
+        # Prefix search (search.py)
+        IndexModel([("search_terms", ASCENDING)], name="search_terms"),
+    ],
+    "contacts": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel(
+            [("created_at", DESCENDING), ("id", DESCENDING)],
+            name="created_at_id",
+        ),
+        IndexModel([("search_terms", ASCENDING)], name="search_terms"),
+    ],
+    # Cold tiers written by archive.py, read with ?include_archived=true
+    "admissions_archive": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel(
+            [("submitted_at", DESCENDING), ("id", DESCENDING)],
+            name="submitted_at_id",
+        ),
+    ],
+    "contacts_archive": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel(
+            [("created_at", DESCENDING), ("id", DESCENDING)],
+            name="created_at_id",
+        ),
+    ],
+    "gallery": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel(
+            [("created_at", DESCENDING), ("id", DESCENDING)],
+            name="created_at_id",
+        ),
+        # Upload dedupe (media.py)
+        IndexModel([("content_hash", ASCENDING)], name="content_hash", sparse=True),
+    ],
+    "announcements": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel(
+            [("is_active", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="is_active_created_at_id",
+        ),
+    ],
+}
+
+# The query shape issued by each route: (label, collection, filter, sort).
+# A sort of None marks a count_documents call rather than a find.
+_PROBE = "00000000-0000-0000-0000-000000000000"
+ROUTE_QUERIES = [
+    ("register/login: user by email", "users", {"email": "probe@example.com"}, []),
+    ("admin_login: admin by email", "users", {"email": "probe@example.com", "role": "admin"}, []),
+    ("get_all_users: page", "users", {"role": "user"}, [("created_at", -1), ("id", -1)]),
+    ("reconcile_counters: users", "users", {"role": "user"}, None),
+    ("delete_user: user by id", "users", {"id": _PROBE}, []),
+    ("get_all_admissions: page", "admissions", {}, [("submitted_at", -1), ("id", -1)]),
+    ("get_admission: by id", "admissions", {"id": _PROBE}, []),
+    ("update_admission_status: by id", "admissions", {"id": _PROBE, "status": {"$ne": "approved"}}, []),
+    ("search_admissions", "admissions", {"search_terms": {"$all": ["probe"]}}, []),
+    ("get_all_contacts: page", "contacts", {}, [("created_at", -1), ("id", -1)]),
+    ("archive_collection: cold admissions", "admissions",
+     {"submitted_at": {"$lt": datetime(2000, 1, 1)}, "restored_at": {"$exists": False},
+      "status": {"$in": ["approved", "rejected"]}}, [("submitted_at", 1)]),
+    ("archive_collection: cold contacts", "contacts",
+     {"created_at": {"$lt": datetime(2000, 1, 1)}, "restored_at": {"$exists": False}}, [("created_at", 1)]),
+    ("get_all_admissions: archived page", "admissions_archive", {}, [("submitted_at", -1), ("id", -1)]),
+    ("get_all_contacts: archived page", "contacts_archive", {}, [("created_at", -1), ("id", -1)]),
+    ("search_contacts", "contacts", {"search_terms": {"$all": ["probe"]}}, []),
+    ("get_gallery: page", "gallery", {}, [("created_at", -1), ("id", -1)]),
+    ("delete_gallery_image: by id", "gallery", {"id": _PROBE}, []),
+    ("upload_gallery_image: by hash", "gallery", {"content_hash": "0" * 64}, []),
+    ("get_announcements: page", "announcements", {"is_active": True}, [("created_at", -1), ("id", -1)]),
+    ("get_announcements: count", "announcements", {"is_active": True}, None),
+    ("update_announcement: by id", "announcements", {"id": _PROBE}, []),
+]
+
+
+async def _create_collection_indexes(collection, models: List[IndexModel], replace_conflicting: bool) -> List[str]:
+    created = []
+    for model in models:
+        keys = list(model.document["key"].items())
+        options = {k: v for k, v in model.document.items() if k != "key"}
+        try:
+            created.append(await collection.create_index(keys, **options))
+        except OperationFailure as exc:
+            if exc.code not in INDEX_CONFLICT_CODES:
+                raise
+            if not replace_conflicting:
+                logger.error(
+                    "Index %s.%s conflicts with an existing one (%s); run `python indexes.py --replace`",
+                    collection.name, options["name"], exc,
+                )
+                continue
+            # Same keys under another name or options: replace it
+            existing = await collection.index_information()
+            for name, info in existing.items():
+                if name != "_id_" and list(info["key"]) == keys:
+                    logger.warning("Replacing index %s.%s", collection.name, name)
+                    await collection.drop_index(name)
+            created.append(await collection.create_index(keys, **options))
+    return created
+
+
+async def ensure_indexes(db, replace_conflicting: bool = False) -> List[str]:
+    """Idempotently create every index in INDEXES, returning their names.
+
+    Conflicting existing indexes are only dropped with `replace_conflicting`.
+    """
+    async def build(collection_name: str, models: List[IndexModel]) -> List[str]:
+        try:
+            names = await _create_collection_indexes(db[collection_name], models, replace_conflicting)
+        except OperationFailure as exc:
+            # e.g. duplicate emails already stored; keep serving, but say so
+            logger.error("Could not build indexes on %s: %s", collection_name, exc)
+            return []
+        return [f"{collection_name}.{name}" for name in names]
+
+    # Collections are independent, so their indexes are built concurrently
+    results = await asyncio.gather(*(build(name, models) for name, models in INDEXES.items()))
+    return [name for names in results for name in names]
+
+
+def _has_collscan(plan) -> bool:
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            return True
+        return any(_has_collscan(v) for v in plan.values())
+    if isinstance(plan, list):
+        return any(_has_collscan(v) for v in plan)
+    return False
+
+
+def _winning_plans(explain):
+    """Yield every winningPlan in an explain document, skipping rejected plans"""
+    if isinstance(explain, dict):
+        if "winningPlan" in explain:
+            yield explain["winningPlan"]
+        for key, value in explain.items():
+            if key not in ("winningPlan", "rejectedPlans"):
+                yield from _winning_plans(value)
+    elif isinstance(explain, list):
+        for value in explain:
+            yield from _winning_plans(value)
+
+
+async def explain_route_queries(db) -> List[Tuple[str, bool]]:
+    """Explain each route query, returning (label, uses_collscan) pairs"""
+    results = []
+    for label, collection_name, query, sort in ROUTE_QUERIES:
+        if sort is None:
+            # count_documents runs as a $match/$group aggregation
+            plan = await db.command(
+                "aggregate", collection_name,
+                pipeline=[{"$match": query}, {"$group": {"_id": 1, "n": {"$sum": 1}}}],
+                explain=True,
+            )
+        else:
+            cursor = db[collection_name].find(query).limit(1)
+            if sort:
+                cursor = cursor.sort(sort)
+            plan = await cursor.explain()
+        results.append((label, any(_has_collscan(p) for p in _winning_plans(plan))))
+    return results
+
+
+async def main(argv: List[str]) -> int:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    try:
+        for name in await ensure_indexes(db, replace_conflicting="--replace" in argv):
+            print(f"✓ {name}")
+
+        if "--check" not in argv:
+            return 0
+
+        failed = False
+        for label, collscan in await explain_route_queries(db):
+            print(f"{'✗ COLLSCAN' if collscan else '✓ IXSCAN  '} {label}")
+            failed = failed or collscan
+        return 1 if failed else 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -0,0 +1,202 @@
+"""Live updates for the admin screens over Server-Sent Events.
+
+Each worker keeps one subscription to Mongo and fans its events out to
+every connected admin, so the dashboard and admissions list no longer
+re-read whole collections to notice new submissions.
+
+The subscription is a change stream on admissions, contacts and
+announcements when the deployment supports it (replica sets, Atlas).
+A standalone local mongod does not, so when the first stream cannot be
+opened LIVE_UPDATES_MODE=auto falls back to polling for newly created
+documents every LIVE_POLL_INTERVAL seconds; in that mode status and
+announcement edits made through this worker are published directly by
+the routes.
+
+Events are {"type": "<admission|contact|announcement>.<created|updated>",
+"doc": {...}}; updated docs may be partial, so clients merge them by id.
+A "resync" event means events were dropped and the client should reload.
+"""
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Set
+
+from serialization import PUBLIC_PROJECTION, dumps
+
+logger = logging.getLogger(__name__)
+
+# Feed configuration
+LIVE_UPDATES_MODE = os.getenv("LIVE_UPDATES_MODE", "auto")  # auto, changestream or poll
+LIVE_POLL_INTERVAL = float(os.getenv("LIVE_POLL_INTERVAL", "2"))
+# Re-read this far back each poll so batched write-behind inserts are not missed
+LIVE_POLL_OVERLAP = timedelta(seconds=float(os.getenv("LIVE_POLL_OVERLAP", "10")))
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "256"))
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+LIVE_POLL_LIMIT = 500
+SEEN_IDS_LIMIT = 10000
+MAX_RETRY_DELAY = 30.0
+
+# Collection -> (event prefix, creation time field)
+LIVE_COLLECTIONS = {
+    "admissions": ("admission", "submitted_at"),
+    "contacts": ("contact", "created_at"),
+    "announcements": ("announcement", "created_at"),
+}
+
+
+class ChangeStreamsUnsupported(Exception):
+    pass
+
+
+def _public(doc: dict) -> dict:
+    return {k: v for k, v in doc.items() if k not in PUBLIC_PROJECTION}
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {dumps(event).decode()}\n\n"
+
+
+class LiveFeed:
+    """One Mongo subscription per worker, fanned out to per-client queues"""
+
+    def __init__(self, db, mode: str = LIVE_UPDATES_MODE):
+        self.db = db
+        self.requested_mode = mode
+        self.mode: Optional[str] = None  # "changestream" or "poll" once running
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # End open streams so the server can shut down
+        for queue in list(self._subscribers):
+            self._deliver(queue, None)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def _deliver(self, queue: asyncio.Queue, event: Optional[dict]):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A client this far behind reloads instead of replaying everything
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({"type": "resync"})
+
+    def broadcast(self, event: dict):
+        for queue in list(self._subscribers):
+            self._deliver(queue, event)
+
+    def publish_update(self, collection: str, doc: dict):
+        """Publish an edit made by this worker; change streams already see it"""
+        if self.mode == "poll":
+            self.broadcast({"type": f"{LIVE_COLLECTIONS[collection][0]}.updated", "doc": doc})
+
+    def publish_resync(self):
+        """Ask clients to reload, for changes too broad to send one by one"""
+        if self.mode == "poll":
+            self.broadcast({"type": "resync"})
+
+    async def stream(self):
+        """SSE body for one client; ends when the client disconnects"""
+        queue = asyncio.Queue(maxsize=LIVE_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        try:
+            yield "retry: 5000\n\n"
+            yield _sse({"type": "ready", "mode": self.mode})
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=LIVE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    return
+                yield _sse(event)
+        finally:
+            self._subscribers.discard(queue)
+
+    async def _run(self):
+        if self.requested_mode != "poll":
+            try:
+                await self._watch()
+            except ChangeStreamsUnsupported:
+                if self.requested_mode == "changestream":
+                    raise
+                logger.info("Change streams unavailable; polling every %ss for live updates", LIVE_POLL_INTERVAL)
+        await self._poll()
+
+    async def _watch(self):
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": list(LIVE_COLLECTIONS)},
+            "operationType": {"$in": ["insert", "update", "replace"]},
+        }}]
+        resume_token = None
+        failures = 0
+        while True:
+            try:
+                async with self.db.watch(
+                    pipeline, full_document="updateLookup", resume_after=resume_token
+                ) as stream:
+                    self.mode = "changestream"
+                    failures = 0
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        event = self._from_change(change)
+                        if event is not None:
+                            self.broadcast(event)
+            except Exception as exc:
+                if self.mode is None:
+                    # Never opened: a standalone server rejects $changeStream, and
+                    # clients such as mongomock fail in their own ways
+                    raise ChangeStreamsUnsupported() from exc
+                failures += 1
+                logger.exception("Change stream failed; reconnecting")
+            if failures > 1:
+                # Events may have been missed while the stream was down
+                self.broadcast({"type": "resync"})
+            await asyncio.sleep(min(2 ** failures, MAX_RETRY_DELAY))
+
+    def _from_change(self, change: dict) -> Optional[dict]:
+        doc = change.get("fullDocument")
+        if doc is None:
+            return None  # deleted before the lookup
+        prefix = LIVE_COLLECTIONS[change["ns"]["coll"]][0]
+        action = "created" if change["operationType"] == "insert" else "updated"
+        return {"type": f"{prefix}.{action}", "doc": _public(doc)}
+
+    async def _poll(self):
+        self.mode = "poll"
+        since = {name: datetime.utcnow() for name in LIVE_COLLECTIONS}
+        seen = OrderedDict()
+        while True:
+            await asyncio.sleep(LIVE_POLL_INTERVAL)
+            if not self._subscribers:
+                since = {name: datetime.utcnow() for name in LIVE_COLLECTIONS}
+                continue
+            for collection, (prefix, field) in LIVE_COLLECTIONS.items():
+                try:
+                    docs = await self.db[collection].find(
+                        {field: {"$gt": since[collection] - LIVE_POLL_OVERLAP}}, PUBLIC_PROJECTION
+                    ).sort(field, 1).limit(LIVE_POLL_LIMIT).to_list(None)
+                except Exception:
+                    logger.exception("Live update poll of %s failed", collection)
+                    continue
+                for doc in docs:
+                    since[collection] = max(since[collection], doc[field])
+                    if doc["id"] in seen:
+                        continue
+                    seen[doc["id"]] = None
+                    if len(seen) > SEEN_IDS_LIMIT:
+                        seen.popitem(last=False)
+                    self.broadcast({"type": f"{prefix}.created", "doc": doc})
@@ -0,0 +1,259 @@
+"""Gallery image uploads: content-addressed storage plus resized WebP variants.
+
+Uploads are streamed to a temporary file while being hashed, so a large
+image is never held in memory. Files are stored under their SHA-256, which
+makes identical uploads free (the existing file and gallery entry are
+reused) and lets every stored file be served as immutable. Resizing runs
+in a bounded worker pool after the upload has been acknowledged; the
+variants and `srcset` are then written onto the gallery document.
+
+MEDIA_STORAGE selects where files live: "local" (MEDIA_ROOT, served by the
+app under MEDIA_URL) or "s3" (any S3-compatible bucket via boto3).
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.staticfiles import StaticFiles
+
+from profiling import background_task
+
+logger = logging.getLogger(__name__)
+
+# Storage configuration
+MEDIA_STORAGE = os.getenv("MEDIA_STORAGE", "local")
+MEDIA_ROOT = Path(os.getenv("MEDIA_ROOT", Path(__file__).parent / "media"))
+MEDIA_URL = os.getenv("MEDIA_URL", "/api/media")
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+S3_PUBLIC_URL = os.getenv("S3_PUBLIC_URL", "")
+
+# Processing configuration
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+VARIANT_WIDTHS = [int(w) for w in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,1280").split(",")]
+WEBP_QUALITY = int(os.getenv("WEBP_QUALITY", "80"))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+ALLOWED_TYPES = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Content type from a file's leading bytes, if it is one of ALLOWED_TYPES"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+class Storage:
+    """Blocking file store; called from worker threads only"""
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def put(self, key: str, path: Path, content_type: str):
+        raise NotImplementedError
+
+    def url(self, key: str) -> str:
+        raise NotImplementedError
+
+
+class LocalStorage(Storage):
+    """Files under MEDIA_ROOT, served by ImmutableStaticFiles"""
+
+    def __init__(self, root: Path, base_url: str):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def exists(self, key: str) -> bool:
+        return (self.root / key).exists()
+
+    def put(self, key: str, path: Path, content_type: str):
+        target = self.root / key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Move into place atomically so readers never see a partial file
+        partial = target.with_name(target.name + ".partial")
+        shutil.copyfile(path, partial)
+        os.replace(partial, target)
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+
+class S3Storage(Storage):
+    """S3 or any S3-compatible object store (MinIO, R2, ...)"""
+
+    def __init__(self, bucket: str, endpoint_url: Optional[str], public_url: str):
+        import boto3  # only needed when this backend is selected
+        self.bucket = bucket
+        self.public_url = public_url.rstrip("/")
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError:
+            return False
+
+    def put(self, key: str, path: Path, content_type: str):
+        self.client.upload_file(
+            str(path), self.bucket, key,
+            ExtraArgs={"ContentType": content_type, "CacheControl": IMMUTABLE_CACHE_CONTROL},
+        )
+
+    def url(self, key: str) -> str:
+        return f"{self.public_url}/{key}"
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles for content-addressed files, cacheable forever"""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+def make_storage() -> Storage:
+    if MEDIA_STORAGE == "s3":
+        return S3Storage(S3_BUCKET, S3_ENDPOINT_URL, S3_PUBLIC_URL)
+    if MEDIA_STORAGE == "local":
+        return LocalStorage(MEDIA_ROOT, MEDIA_URL)
+    raise ValueError(f"Unknown MEDIA_STORAGE: {MEDIA_STORAGE}")
+
+
+def _make_variants(storage: Storage, source: Path, content_hash: str) -> List[dict]:
+    """Resize one stored original into WebP variants (runs in a worker thread)"""
+    from PIL import Image, ImageOps
+
+    variants = []
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+        # Never upscale; the largest variant is at most the original width
+        widths = sorted({min(w, image.width) for w in VARIANT_WIDTHS})
+        for width in widths:
+            height = max(1, round(image.height * width / image.width))
+            key = f"variants/{content_hash[:2]}/{content_hash}/{width}.webp"
+            if not storage.exists(key):
+                resized = image.resize((width, height), Image.LANCZOS)
+                with tempfile.NamedTemporaryFile(suffix=".webp") as tmp:
+                    resized.save(tmp.name, "WEBP", quality=WEBP_QUALITY, method=4)
+                    storage.put(key, Path(tmp.name), "image/webp")
+            variants.append({"url": storage.url(key), "width": width, "height": height, "format": "webp"})
+    return variants
+
+
+def srcset(variants: List[dict]) -> str:
+    return ", ".join(f"{v['url']} {v['width']}w" for v in variants)
+
+
+class MediaPipeline:
+    """Accepts uploads and resizes them in a bounded background pool"""
+
+    def __init__(self, storage: Storage, workers: int):
+        self.storage = storage
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks = set()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="images")
+        return self._executor
+
+    async def _in_pool(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def store_upload(self, upload: UploadFile) -> dict:
+        """Stream an upload to storage under its content hash.
+
+        Returns {"content_hash", "key", "url", "path"}; `path` is a local
+        copy the caller must pass to `process` or `discard`.
+        """
+        # The stored type comes from the bytes; the client's Content-Type is not trusted
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        content_type = sniff_image_type(chunk)
+        if content_type is None:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=f"Unsupported image type; use one of {', '.join(ALLOWED_TYPES)}"
+            )
+        extension = ALLOWED_TYPES[content_type]
+
+        digest = hashlib.sha256()
+        size = 0
+        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=f".{extension}")
+        try:
+            with tmp:
+                while chunk:
+                    size += len(chunk)
+                    if size > MAX_UPLOAD_BYTES:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Images are limited to {MAX_UPLOAD_BYTES // (1024 * 1024)} MB"
+                        )
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+
+            content_hash = digest.hexdigest()
+            key = f"originals/{content_hash[:2]}/{content_hash}.{extension}"
+            if not await self._in_pool(self.storage.exists, key):
+                await self._in_pool(self.storage.put, key, Path(tmp.name), content_type)
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+
+        return {"content_hash": content_hash, "key": key, "url": self.storage.url(key), "path": Path(tmp.name)}
+
+    def discard(self, stored: dict):
+        stored["path"].unlink(missing_ok=True)
+
+    def process(self, stored: dict, on_done):
+        """Resize in the background, then await `on_done(variants)`"""
+        async def run():
+            try:
+                variants = await self._in_pool(
+                    _make_variants, self.storage, stored["path"], stored["content_hash"]
+                )
+                await on_done(variants)
+            except Exception:
+                logger.exception("Failed to build image variants for %s", stored["content_hash"])
+            finally:
+                self.discard(stored)
+
+        task = background_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def shutdown(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,302 @@
+"""Prometheus-style metrics for the API, Mongo, bcrypt, JWT, serialization and the event loop.
+
+Metrics are kept in process and rendered in the Prometheus text format at
+GET /api/metrics. With several workers each one reports its own series,
+so scrape them individually or aggregate across workers in queries.
+"""
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from pymongo import monitoring
+
+from profiling import record_command
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+LOOP_LAG_INTERVAL = 0.5
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # per-bucket counts (+Inf last), sum, count
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time; the callback returns
+    either a number or a {label tuple: number} dict"""
+
+    def __init__(self, name: str, help_text: str, read: Callable, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.read = read
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        value = self.read()
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for labels, number in sorted(items):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {number}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help_text: str, read: Callable, labels: Sequence[str] = ()):
+        return self.register(Gauge(name, help_text, read, labels))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                logger.exception("Failed to render metric %s", metric.name)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")))
+HTTP_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+MONGO_LATENCY = registry.register(Histogram(
+    "mongo_command_duration_seconds", "Mongo command latency", ("collection", "command"), FAST_BUCKETS + (0.25, 1.0)))
+MONGO_FAILURES = registry.register(Counter(
+    "mongo_command_failures_total", "Failed Mongo commands", ("collection", "command")))
+PASSWORD_HASH_SECONDS = registry.register(Histogram(
+    "password_hash_duration_seconds", "bcrypt time per call", ("operation",)))
+PASSWORD_QUEUE_SECONDS = registry.register(Histogram(
+    "password_queue_wait_seconds", "Wait for a bcrypt worker", ("operation",)))
+JWT_VERIFY_SECONDS = registry.register(Histogram(
+    "jwt_verify_duration_seconds", "JWT signature verification time", (), FAST_BUCKETS))
+JWT_CACHE = registry.register(Counter(
+    "jwt_cache_total", "Verified-token cache lookups", ("result",)))
+SERIALIZE_SECONDS = registry.register(Histogram(
+    "response_serialize_duration_seconds", "JSON encoding time for database documents", (), FAST_BUCKETS))
+POOL_CHECKOUT_SECONDS = registry.register(Histogram(
+    "mongo_pool_checkout_wait_seconds", "Wait for a pooled Mongo connection", (), FAST_BUCKETS + (0.25, 1.0, 5.0)))
+POOL_CHECKOUT_FAILURES = registry.register(Counter(
+    "mongo_pool_checkout_failures_total", "Failed connection checkouts by reason", ("reason",)))
+LOOP_LAG = registry.register(Histogram(
+    "event_loop_lag_seconds", "Delay of a scheduled wakeup on the event loop", (), LATENCY_BUCKETS))
+
+
+class CommandTimer(monitoring.CommandListener):
+    """pymongo command listener feeding MONGO_LATENCY"""
+
+    def __init__(self):
+        self._collections: Dict[Tuple, str] = {}
+
+    @staticmethod
+    def _key(event) -> Tuple:
+        return (event.connection_id, event.request_id)
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        self._collections[self._key(event)] = target if isinstance(target, str) else "-"
+
+    def succeeded(self, event):
+        collection = self._collections.pop(self._key(event), "-")
+        MONGO_LATENCY.observe(event.duration_micros / 1e6, collection, event.command_name)
+        record_command(collection, event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._collections.pop(self._key(event), "-")
+        MONGO_LATENCY.observe(event.duration_micros / 1e6, collection, event.command_name)
+        MONGO_FAILURES.inc(collection, event.command_name)
+        record_command(collection, event.command_name, event.duration_micros / 1e6)
+
+
+command_timer = CommandTimer()
+
+
+def _address(address) -> str:
+    return f"{address[0]}:{address[1]}"
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """pymongo pool listener tracking open and checked-out connections per server"""
+
+    def __init__(self):
+        self.open: Dict[Tuple[str], int] = {}
+        self.checked_out: Dict[Tuple[str], int] = {}
+        self._lock = threading.Lock()
+        # Checkout started/finished events arrive on the same thread
+        self._checkout_started = threading.local()
+
+    def _add(self, counts: dict, address, amount: int):
+        key = (_address(address),)
+        with self._lock:
+            counts[key] = max(0, counts.get(key, 0) + amount)
+
+    def pool_created(self, event):
+        self._add(self.open, event.address, 0)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        key = (_address(event.address),)
+        with self._lock:
+            self.open.pop(key, None)
+            self.checked_out.pop(key, None)
+
+    def connection_created(self, event):
+        self._add(self.open, event.address, 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add(self.open, event.address, -1)
+
+    def connection_check_out_started(self, event):
+        self._checkout_started.value = time.perf_counter()
+
+    def _checkout_wait(self) -> float:
+        started = getattr(self._checkout_started, "value", None)
+        return 0.0 if started is None else time.perf_counter() - started
+
+    def connection_check_out_failed(self, event):
+        POOL_CHECKOUT_SECONDS.observe(self._checkout_wait())
+        POOL_CHECKOUT_FAILURES.inc(str(event.reason))
+
+    def connection_checked_out(self, event):
+        POOL_CHECKOUT_SECONDS.observe(self._checkout_wait())
+        self._add(self.checked_out, event.address, 1)
+
+    def connection_checked_in(self, event):
+        self._add(self.checked_out, event.address, -1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "open": {key[0]: n for key, n in self.open.items()},
+                "checked_out": {key[0]: n for key, n in self.checked_out.items()},
+            }
+
+
+pool_monitor = PoolMonitor()
+registry.gauge("mongo_pool_connections", "Open connections per server", lambda: dict(pool_monitor.open), ("address",))
+registry.gauge("mongo_pool_checked_out", "Connections in use per server", lambda: dict(pool_monitor.checked_out), ("address",))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request by route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the scope; templates
+            # such as /api/admissions/{admission_id} keep label cardinality low
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_LATENCY.observe(time.perf_counter() - started, scope["method"], route_path)
+            HTTP_REQUESTS.inc(scope["method"], route_path, str(status_code))
+
+
+async def monitor_loop_lag(interval: float = LOOP_LAG_INTERVAL):
+    """Measure how late the loop wakes up from a fixed sleep; run as a task"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, loop.time() - expected))
+
+
+def render() -> str:
+    return registry.render()
@@ -49,6 +49,20 @@ class Admission(AdmissionCreate):
 class AdmissionStatusUpdate(BaseModel):
     status: str
 
+class AdmissionStatusItem(BaseModel):
+    id: str
+    status: str
+
+class AdmissionFilter(BaseModel):
+    status: Optional[str] = None
+    grade: Optional[str] = None
+
+class AdmissionBulkStatusUpdate(BaseModel):
+    # Either explicit (id, status) pairs, or a filter plus the status to set
+    updates: List[AdmissionStatusItem] = []
+    filter: Optional[AdmissionFilter] = None
+    status: Optional[str] = None
+
 # Contact Models
 class ContactCreate(BaseModel):
     name: str
@@ -67,10 +81,20 @@ class GalleryCreate(BaseModel):
     image_url: str
     category: str = "campus"
 
+class ImageVariant(BaseModel):
+    url: str
+    width: int
+    height: int
+    format: str
+
 class Gallery(GalleryCreate):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     uploaded_by: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Set for uploaded images; variants/srcset fill in once resizing finishes
+    content_hash: Optional[str] = None
+    variants: List[ImageVariant] = []
+    srcset: Optional[str] = None
 
 # Announcement Models
 class AnnouncementCreate(BaseModel):
@@ -89,3 +113,16 @@ class AnnouncementUpdate(BaseModel):
     content: Optional[str] = None
     category: Optional[str] = None
     is_active: Optional[bool] = None
+
+# Bulk Models
+class BulkDelete(BaseModel):
+    ids: List[str]
+
+class BulkItemResult(BaseModel):
+    id: str
+    result: str  # updated, unchanged, conflict, deleted or not_found
+
+class BulkResult(BaseModel):
+    matched: int
+    modified: int
+    results: List[BulkItemResult] = []
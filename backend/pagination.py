@@ -0,0 +1,149 @@
+import asyncio
+import heapq
+import os
+from typing import Optional, List, Dict, Tuple, Type
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+
+from serialization import TrustedJSONResponse, PUBLIC_PROJECTION
+
+# Page size configuration
+DEFAULT_PAGE_SIZE = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
+MAX_PAGE_SIZE = int(os.getenv("PAGE_SIZE_MAX", "1000"))
+
+TOTAL_COUNT_HEADER = "X-Total-Count"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """Query parameters shared by every paginated list endpoint"""
+
+    def __init__(
+        self,
+        after: Optional[str] = Query(None, description="Return items after this id"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        order: str = Query("desc", pattern="^(asc|desc)$"),
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    ):
+        self.after = after
+        self.limit = limit
+        self.order = order
+        self.fields = fields
+
+    @property
+    def direction(self) -> int:
+        return -1 if self.order == "desc" else 1
+
+
+def build_projection(page: PageParams, model: Type[BaseModel], sort_field: str, exclude=()) -> dict:
+    """Build the Mongo projection for a page, validating requested fields"""
+    if not page.fields:
+        projection = dict(PUBLIC_PROJECTION)
+        for field in exclude:
+            projection[field] = 0
+        return projection
+
+    requested = {f.strip() for f in page.fields.split(",") if f.strip()}
+    unknown = requested - set(model.model_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+
+    # The cursor needs `id` and the sort key on every returned document
+    projection = {field: 1 for field in requested | {"id", sort_field}}
+    projection["_id"] = 0
+    return projection
+
+
+async def keyset_filter(collection, query: dict, page: PageParams, sort_field: str, archive=None) -> dict:
+    """Extend `query` so it only matches documents after the `after` cursor"""
+    if not page.after:
+        return query
+
+    anchor = None
+    for source in (collection, archive):
+        if source is not None and anchor is None:
+            anchor = await source.find_one(
+                {**query, "id": page.after},
+                {"_id": 0, "id": 1, sort_field: 1}
+            )
+    if not anchor:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+    op = "$lt" if page.direction == -1 else "$gt"
+    value = anchor.get(sort_field)
+    return {
+        "$and": [
+            query,
+            {"$or": [
+                {sort_field: {op: value}},
+                {sort_field: value, "id": {op: page.after}},
+            ]},
+        ]
+    }
+
+
+async def fetch_page(
+    collection,
+    query: dict,
+    page: PageParams,
+    *,
+    model: Type[BaseModel],
+    sort_field: str,
+    exclude=(),
+    archive=None,
+) -> Tuple[List[dict], Dict[str, str]]:
+    """Fetch one keyset page of raw documents and its pagination headers.
+
+    With `archive`, the page is drawn from both collections, merged in order.
+    """
+    projection = build_projection(page, model, sort_field, exclude)
+    page_query = await keyset_filter(collection, query, page, sort_field, archive)
+    sources = [collection] if archive is None else [collection, archive]
+
+    def page_of(source):
+        return (
+            source.find(page_query, projection)
+            .sort([(sort_field, page.direction), ("id", page.direction)])
+            .limit(page.limit + 1)
+            .to_list(page.limit + 1)
+        )
+
+    def count(source):
+        # An unfiltered count_documents is a full scan; the metadata count is O(1)
+        return source.count_documents(query) if query else source.estimated_document_count()
+
+    results = await asyncio.gather(*map(page_of, sources), *map(count, sources))
+    pages, total = results[:len(sources)], sum(results[len(sources):])
+    docs = pages[0] if archive is None else list(heapq.merge(
+        *pages, key=lambda doc: (doc[sort_field], doc["id"]), reverse=page.direction == -1
+    ))[:page.limit + 1]
+
+    headers = {TOTAL_COUNT_HEADER: str(total)}
+    if len(docs) > page.limit:
+        docs = docs[:page.limit]
+        headers[NEXT_CURSOR_HEADER] = docs[-1]["id"]
+    return docs, headers
+
+
+async def paginate(
+    collection,
+    query: dict,
+    page: PageParams,
+    *,
+    model: Type[BaseModel],
+    sort_field: str,
+    exclude=(),
+    archive=None,
+) -> TrustedJSONResponse:
+    """Fetch one keyset page of `collection` as a response with pagination headers.
+
+    Documents are encoded as stored; `model` only validates `?fields=`.
+    """
+    docs, headers = await fetch_page(
+        collection, query, page, model=model, sort_field=sort_field, exclude=exclude, archive=archive
+    )
+    return TrustedJSONResponse(docs, headers=headers)
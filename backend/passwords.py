@@ -0,0 +1,117 @@
+"""Async password hashing off the event loop.
+
+bcrypt takes a few hundred milliseconds per call, so hashing runs in a
+bounded thread pool (bcrypt releases the GIL). When more than
+PASSWORD_HASH_MAX_PENDING calls are waiting, new ones are refused with 503
+rather than queueing until every request times out.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from auth import get_password_hash, verify_and_update_password
+from metrics import PASSWORD_HASH_SECONDS, PASSWORD_QUEUE_SECONDS
+from profiling import record
+
+# Pool configuration
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+PASSWORD_HASH_RETRY_AFTER = os.getenv("PASSWORD_HASH_RETRY_AFTER", "1")
+
+
+class PasswordHasher:
+    """Bounded worker pool for bcrypt with queue-wait and hash-time metrics"""
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "calls": 0,
+            "rejected": 0,
+            "queue_wait_seconds_total": 0.0,
+            "queue_wait_seconds_max": 0.0,
+            "hash_seconds_total": 0.0,
+            "hash_seconds_max": 0.0,
+        }
+
+    def _record(self, operation: str, wait: float, elapsed: float):
+        PASSWORD_QUEUE_SECONDS.observe(wait, operation)
+        PASSWORD_HASH_SECONDS.observe(elapsed, operation)
+        with self._metrics_lock:
+            m = self._metrics
+            m["calls"] += 1
+            m["queue_wait_seconds_total"] += wait
+            m["queue_wait_seconds_max"] = max(m["queue_wait_seconds_max"], wait)
+            m["hash_seconds_total"] += elapsed
+            m["hash_seconds_max"] = max(m["hash_seconds_max"], elapsed)
+
+    async def _run(self, operation: str, func, *args):
+        if self._pending >= self.max_pending:
+            with self._metrics_lock:
+                self._metrics["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again",
+                headers={"Retry-After": PASSWORD_HASH_RETRY_AFTER},
+            )
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="bcrypt"
+            )
+
+        queued_at = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self._record(operation, started - queued_at, time.perf_counter() - started)
+
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            self._pending -= 1
+            # Queue wait included: that is what the request spent on bcrypt
+            record("bcrypt", time.perf_counter() - queued_at)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password in the worker pool"""
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password in the worker pool.
+
+        Returns (valid, new_hash); new_hash is set when the stored hash uses
+        an outdated scheme or cost factor and should be replaced.
+        """
+        return await self._run("verify", verify_and_update_password, password, hashed_password)
+
+    def snapshot(self) -> dict:
+        """Current pool state and cumulative timings"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics.update(
+            workers=self.workers,
+            max_pending=self.max_pending,
+            pending=self._pending,
+        )
+        return metrics
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
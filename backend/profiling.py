@@ -0,0 +1,290 @@
+"""Per-request profiling and the slow-request log.
+
+Every request carries a RequestProfile in a context variable. The code
+that already feeds metrics.py adds to it: Mongo command durations (from
+the pymongo listener, which Motor's executor threads see through the
+copied context), bcrypt time, JWT verification and response encoding.
+Requests slower than PROFILE_SLOW_MS are kept in a ring buffer of the
+last PROFILE_BUFFER_SIZE, readable at GET /api/admin/profiles.
+
+An admin can send `X-Profile: 1`, and PROFILE_SAMPLE_RATE picks a share
+of all requests, to also run a sampling profiler on the event loop for
+that request. Its samples are grouped by library (pydantic, jose, json)
+and by stack. Only the loop thread is sampled: Mongo commands and bcrypt
+run in worker threads, so their share shows in `timings_ms` instead. The
+loop is shared, so work for concurrent requests lands in the same
+samples; profile on a quiet worker for a clean split. Like the metrics,
+buffers are per worker.
+
+Tasks a request starts to outlive it are created with `background_task`,
+outside the request's context, so their work is not charged to it.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import Context, ContextVar
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Profiling configuration
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "1000"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "100"))
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_MS", "1")) / 1000
+MAX_COMMANDS = 200
+TOP_STACKS = 25
+STACK_DEPTH = 12
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# Sample categories by the library the innermost matching frame lives in.
+# Mongo I/O and bcrypt run off the loop thread; see RequestProfile.timings.
+SAMPLE_CATEGORIES = (
+    ("pydantic", ("pydantic", "pydantic_core")),
+    ("jwt", ("jose",)),
+    ("json", ("orjson", "json")),
+    ("idle", ("selectors",)),  # the loop waiting on awaited I/O
+)
+
+
+class RequestProfile:
+    """Timings collected for one request"""
+
+    def __init__(self, method: str, path: str):
+        self.id = None
+        self.method = method
+        self.path = path
+        self.route = None
+        self.status = None
+        self.started_at = datetime.utcnow()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.timings: Dict[str, float] = {}
+        self.commands: List[dict] = []
+        self.dropped_commands = 0
+        self.samples: Optional[dict] = None
+        self.trigger = "slow"
+
+    def add(self, category: str, seconds: float):
+        self.timings[category] = self.timings.get(category, 0.0) + seconds
+
+    def add_command(self, collection: str, command: str, seconds: float):
+        self.add("mongo", seconds)
+        if len(self.commands) < MAX_COMMANDS:
+            self.commands.append({"collection": collection, "command": command, "ms": round(seconds * 1000, 3)})
+        else:
+            self.dropped_commands += 1
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3),
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            **self.summary(),
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "timings_ms": {k: round(v * 1000, 3) for k, v in sorted(self.timings.items())},
+            "mongo_commands": self.commands,
+            "mongo_commands_dropped": self.dropped_commands,
+            "samples": self.samples,
+        }
+
+
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+def record(category: str, seconds: float):
+    """Add time spent in `category` to the current request's profile, if any"""
+    profile = current_profile.get()
+    if profile is not None:
+        profile.add(category, seconds)
+
+
+def record_command(collection: str, command: str, seconds: float):
+    profile = current_profile.get()
+    if profile is not None:
+        profile.add_command(collection, command, seconds)
+
+
+def background_task(coro) -> asyncio.Task:
+    """create_task in a fresh context, detached from the current request's profile"""
+    return Context().run(asyncio.create_task, coro)
+
+
+def _module(filename: str) -> str:
+    return filename.replace("\\", "/").rsplit("/", 1)[-1].rsplit(".", 1)[0]
+
+
+def _categorize(frame) -> str:
+    """Category of the innermost frame that belongs to a known library"""
+    while frame is not None:
+        parts = frame.f_code.co_filename.replace("\\", "/").split("/")
+        names = set(parts[:-1]) | {_module(parts[-1])}
+        for category, libraries in SAMPLE_CATEGORIES:
+            if names.intersection(libraries):
+                return category
+        frame = frame.f_back
+    return "app"
+
+
+class StackSampler:
+    """Samples another thread's stack from a background thread"""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.categories = Counter()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            self.categories[_categorize(frame)] += 1
+            stack = []
+            while frame is not None and len(stack) < STACK_DEPTH:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({_module(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> dict:
+        self._stop.set()
+        self._thread.join()
+        total = sum(self.categories.values())
+        return {
+            "interval_ms": self.interval * 1000,
+            "count": total,
+            "by_category": {k: round(n / total, 3) for k, n in self.categories.most_common()} if total else {},
+            "top_stacks": [{"stack": stack, "count": n} for stack, n in self.stacks.most_common(TOP_STACKS)],
+        }
+
+
+class ProfileLog:
+    """Bounded ring buffer of captured request profiles"""
+
+    def __init__(self, size: int = PROFILE_BUFFER_SIZE):
+        self._profiles = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile):
+        with self._lock:
+            profile.id = f"{os.getpid()}-{next(self._ids)}"
+            self._profiles.append(profile)
+
+    def list(self) -> List[dict]:
+        with self._lock:
+            return [profile.summary() for profile in reversed(self._profiles)]
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        with self._lock:
+            for profile in self._profiles:
+                if profile.id == profile_id:
+                    return profile.to_dict()
+        return None
+
+
+profile_log = ProfileLog()
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware attaching a RequestProfile to every HTTP request.
+
+    `authorize(authorization_header)` decides whether a request may ask for
+    sampling with X-Profile; it should accept admin tokens only.
+    """
+
+    def __init__(self, app, authorize: Callable[[bytes], bool], log: ProfileLog = profile_log):
+        self.app = app
+        self.authorize = authorize
+        self.log = log
+
+    def _wants_sampling(self, scope) -> Optional[str]:
+        headers = dict(scope["headers"])
+        if headers.get(PROFILE_HEADER) in (b"1", b"true") and self.authorize(headers.get(b"authorization", b"")):
+            return "header"
+        if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = current_profile.set(profile)
+        trigger = self._wants_sampling(scope)
+        sampler = None
+        if trigger:
+            profile.trigger = trigger
+            self.log.add(profile)  # assigns the id returned in the header
+            sampler = StackSampler(threading.get_ident())
+            sampler.start()
+
+        async def counting_receive():
+            message = await receive()
+            profile.request_bytes += len(message.get("body", b""))
+            return message
+
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal streaming
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                streaming = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+                if sampler is not None:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (PROFILE_ID_HEADER.lower().encode(), profile.id.encode())
+                    ]
+            elif message["type"] == "http.response.body":
+                profile.response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, send_wrapper)
+        finally:
+            profile.duration = time.perf_counter() - profile.started
+            route = scope.get("route")
+            profile.route = getattr(route, "path", None)
+            if sampler is not None:
+                profile.samples = sampler.stop()
+            elif profile.duration * 1000 >= PROFILE_SLOW_MS and not streaming:
+                # Live-update streams are long by design
+                self.log.add(profile)
+                logger.warning(
+                    "Slow request %s %s took %.0f ms (profile %s)",
+                    profile.method, profile.path, profile.duration * 1000, profile.id,
+                )
+            current_profile.reset(token)
@@ -0,0 +1,283 @@
+"""Rate limiting and admission control for the unauthenticated routes.
+
+RateLimitMiddleware applies token buckets per client IP and, for login and
+registration, per submitted email, so one address cannot be brute-forced
+from many IPs. Buckets live in an in-process LRU (O(1) lookup and
+eviction) or, with RATE_LIMIT_BACKEND=mongo, in a collection shared by
+every worker. Independently, at most MAX_CONCURRENT_REQUESTS requests run
+at once per worker; beyond that new requests get an immediate 503 instead
+of queueing behind bcrypt and Mongo until every request is slow. An
+event stream (the admin live feed) gives up its slot once it has started.
+
+Limits are "<count>/<second|minute|hour>" and can be overridden with
+RATE_LIMIT_RULES, a JSON object such as
+{"POST /api/auth/login": {"ip": "20/minute", "email": "5/minute"}}.
+"""
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+# Limiter configuration
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "256"))
+# Honour X-Forwarded-For only behind a proxy that sets it
+TRUST_PROXY_HEADERS = os.getenv("TRUST_PROXY_HEADERS", "false").lower() == "true"
+# Proxies in front of the app that each append a hop to X-Forwarded-For
+TRUSTED_PROXY_COUNT = max(1, int(os.getenv("TRUSTED_PROXY_COUNT", "1")))
+MAX_INSPECTED_BODY = 64 * 1024
+
+DEFAULT_RULES = {
+    "POST /api/auth/login": {"ip": "20/minute", "email": "5/minute"},
+    "POST /api/admin/login": {"ip": "10/minute", "email": "5/minute"},
+    "POST /api/auth/register": {"ip": "5/minute"},
+    "POST /api/admissions": {"ip": "10/minute"},
+    "POST /api/contact": {"ip": "10/minute"},
+}
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+
+def parse_limit(limit: str) -> Tuple[float, float]:
+    """"10/minute" -> (refill rate per second, burst size)"""
+    count, period = limit.split("/")
+    return int(count) / PERIODS[period], float(count)
+
+
+def load_rules() -> Dict[str, Dict[str, Tuple[float, float]]]:
+    rules = dict(DEFAULT_RULES)
+    rules.update(json.loads(os.getenv("RATE_LIMIT_RULES", "{}")))
+    return {
+        route: {scope: parse_limit(limit) for scope, limit in limits.items()}
+        for route, limits in rules.items()
+    }
+
+
+class MemoryBucketStore:
+    """Token buckets in an LRU; the least recently used key is evicted first"""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: float, burst: float) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, seconds until a token is available)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class MongoBucketStore:
+    """Token buckets shared by all workers, updated atomically in one round trip"""
+
+    def __init__(self, db, collection: str = "rate_limits"):
+        self.db = db
+        self.collection = collection
+
+    @property
+    def buckets(self):
+        # Resolved per use: the database handle may be a proxy that connects later
+        return self.db[self.collection]
+
+    async def setup(self):
+        await self.buckets.create_index("expires_at", expireAfterSeconds=0)
+
+    async def take(self, key: str, rate: float, burst: float) -> Tuple[bool, float]:
+        now = time.time()
+        refilled = {"$min": [burst, {"$add": [
+            {"$ifNull": ["$tokens", burst]},
+            {"$multiply": [{"$subtract": [now, {"$ifNull": ["$updated", now]}]}, rate]},
+        ]}]}
+        bucket = await self.buckets.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated": now}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    # A bucket idle long enough to be full again can be forgotten
+                    "expires_at": datetime.utcnow() + timedelta(seconds=burst / rate),
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        allowed = bucket["allowed"]
+        return allowed, 0.0 if allowed else (1 - bucket["tokens"]) / rate
+
+    def __len__(self):
+        return 0  # not tracked locally
+
+
+class RateLimiter:
+    """Rules, bucket store and concurrency accounting shared with the middleware"""
+
+    def __init__(self, store, rules, max_concurrent: int, enabled: bool = True):
+        self.store = store
+        self.rules = rules
+        self.max_concurrent = max_concurrent
+        self.enabled = enabled
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.shed = 0
+        self.allowed: Dict[str, int] = {}
+        self.limited: Dict[str, int] = {}
+
+    async def setup(self):
+        if hasattr(self.store, "setup"):
+            await self.store.setup()
+
+    async def check(self, route: str, scope: str, key: str) -> Optional[float]:
+        """Return None if allowed, else the Retry-After in seconds"""
+        rate, burst = self.rules[route][scope]
+        allowed, retry_after = await self.store.take(f"{route}|{scope}|{key}", rate, burst)
+        counter = self.allowed if allowed else self.limited
+        name = f"{route} {scope}"
+        counter[name] = counter.get(name, 0) + 1
+        return None if allowed else retry_after
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "max_concurrent": self.max_concurrent,
+            "shed": self.shed,
+            "tracked_keys": len(self.store),
+            "allowed": dict(self.allowed),
+            "limited": dict(self.limited),
+        }
+
+
+def make_rate_limiter(db) -> RateLimiter:
+    if RATE_LIMIT_BACKEND == "mongo":
+        store = MongoBucketStore(db)
+    elif RATE_LIMIT_BACKEND == "memory":
+        store = MemoryBucketStore(RATE_LIMIT_MAX_KEYS)
+    else:
+        raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {RATE_LIMIT_BACKEND}")
+    return RateLimiter(store, load_rules(), MAX_CONCURRENT_REQUESTS, RATE_LIMIT_ENABLED)
+
+
+async def _json_error(send, status_code: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _client_ip(scope) -> str:
+    if TRUST_PROXY_HEADERS:
+        hops = [
+            hop.strip()
+            for name, value in scope["headers"] if name == b"x-forwarded-for"
+            for hop in value.decode("latin-1").split(",") if hop.strip()
+        ]
+        # Entries left of what our own proxies appended are client-controlled
+        if len(hops) >= TRUSTED_PROXY_COUNT:
+            return hops[-TRUSTED_PROXY_COUNT]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware so streaming responses pass through untouched"""
+
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.limiter.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiter
+        if limiter.in_flight >= limiter.max_concurrent:
+            limiter.shed += 1
+            await _json_error(send, 503, "Server is busy, please try again", 1)
+            return
+
+        limiter.in_flight += 1
+        limiter.max_in_flight = max(limiter.max_in_flight, limiter.in_flight)
+        held = True
+
+        async def releasing_send(message):
+            nonlocal held
+            # Event streams stay open for as long as the client watches; once
+            # one starts it is no longer load on the worker, so free its slot
+            if held and message["type"] == "http.response.start" and any(
+                name == b"content-type" and value.startswith(b"text/event-stream")
+                for name, value in message.get("headers", [])
+            ):
+                held = False
+                limiter.in_flight -= 1
+            await send(message)
+
+        try:
+            route = f"{scope['method']} {scope['path'].rstrip('/')}"
+            rules = limiter.rules.get(route)
+            if rules:
+                retry_after = await limiter.check(route, "ip", _client_ip(scope)) if "ip" in rules else None
+                if retry_after is None and "email" in rules:
+                    receive, email = await self._read_email(receive)
+                    if email:
+                        retry_after = await limiter.check(route, "email", email)
+                if retry_after is not None:
+                    await _json_error(send, 429, "Too many requests, please slow down", retry_after)
+                    return
+            await self.app(scope, receive, releasing_send)
+        finally:
+            if held:
+                limiter.in_flight -= 1
+
+    async def _read_email(self, receive):
+        """Buffer a small JSON body to find its email, then replay it to the app"""
+        messages, size = [], 0
+        while True:
+            message = await receive()
+            messages.append(message)
+            size += len(message.get("body", b""))
+            if not message.get("more_body") or size > MAX_INSPECTED_BODY:
+                break
+
+        email = None
+        if size <= MAX_INSPECTED_BODY:
+            try:
+                payload = json.loads(b"".join(m.get("body", b"") for m in messages))
+                if isinstance(payload, dict) and isinstance(payload.get("email"), str):
+                    email = payload["email"].strip().lower()
+            except ValueError:
+                pass
+
+        async def replay():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        return replay, email
@@ -0,0 +1,213 @@
+"""Read-through cache of serialized JSON responses for public GET routes.
+
+Entries hold the encoded body plus headers and a strong ETag, so a hit
+skips Mongo, model validation and JSON encoding, and a matching
+If-None-Match is answered with an empty 304. Each namespace ("gallery",
+"announcements") carries a version that write routes bump; keys embed the
+version, so a bump orphans every old entry at once, including ones being
+built concurrently with the write.
+
+RESPONSE_CACHE_BACKEND selects the store: "memory" (per worker, default)
+or "mongo" (shared by all workers through the `response_cache` collection).
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+from serialization import dumps
+
+# Cache configuration
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+# Browsers revalidate every time; unchanged data costs a bodiless 304
+RESPONSE_CACHE_CONTROL = os.getenv("RESPONSE_CACHE_CONTROL", "public, max-age=0, must-revalidate")
+
+CACHE_STATUS_HEADER = "X-Cache"
+
+
+class CacheBackend:
+    """Storage interface for cached entries and namespace versions"""
+
+    async def get(self, key: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def set(self, key: str, entry: dict, ttl: int):
+        raise NotImplementedError
+
+    async def get_version(self, namespace: str) -> int:
+        raise NotImplementedError
+
+    async def bump_version(self, namespace: str):
+        raise NotImplementedError
+
+    async def setup(self):
+        """Prepare backing storage; called once at startup"""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, entry = item
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    async def set(self, key: str, entry: dict, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get_version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    async def bump_version(self, namespace: str):
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            # Old-version entries can never be read again; free them now
+            prefix = f"{namespace}:"
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+
+class MongoCacheBackend(CacheBackend):
+    """Shared store for multi-worker deployments, expired by a TTL index"""
+
+    def __init__(self, db, collection: str = "response_cache"):
+        self.db = db
+        self.collection = collection
+
+    @property
+    def entries(self):
+        # Resolved per use: the database handle may be a proxy that connects later
+        return self.db[self.collection]
+
+    @property
+    def versions(self):
+        return self.db[f"{self.collection}_versions"]
+
+    async def setup(self):
+        await self.entries.create_index("expires_at", expireAfterSeconds=0)
+
+    async def get(self, key: str) -> Optional[dict]:
+        doc = await self.entries.find_one({"_id": key})
+        if doc is None or doc["expires_at"] <= datetime.utcnow():
+            return None
+        return doc["entry"]
+
+    async def set(self, key: str, entry: dict, ttl: int):
+        await self.entries.replace_one(
+            {"_id": key},
+            {"entry": entry, "expires_at": datetime.utcnow() + timedelta(seconds=ttl)},
+            upsert=True,
+        )
+
+    async def get_version(self, namespace: str) -> int:
+        doc = await self.versions.find_one({"_id": namespace})
+        return doc["version"] if doc else 0
+
+    async def bump_version(self, namespace: str):
+        await self.versions.update_one(
+            {"_id": namespace}, {"$inc": {"version": 1}}, upsert=True
+        )
+
+
+def make_backend(db) -> CacheBackend:
+    if RESPONSE_CACHE_BACKEND == "mongo":
+        return MongoCacheBackend(db)
+    if RESPONSE_CACHE_BACKEND == "memory":
+        return MemoryCacheBackend(RESPONSE_CACHE_MAX_ENTRIES)
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {RESPONSE_CACHE_BACKEND}")
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def make_entry(content, headers: Dict[str, str]) -> dict:
+    """Encode content once into a cacheable {"body", "etag", "headers"} entry"""
+    body = dumps(content)
+    return {
+        "body": body,
+        "etag": '"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+        "headers": headers,
+    }
+
+
+def entry_response(request: Request, entry: dict, cache_status: str) -> Response:
+    """Serve an entry, or an empty 304 when the client already has it"""
+    headers = {
+        **entry["headers"],
+        "ETag": entry["etag"],
+        "Cache-Control": RESPONSE_CACHE_CONTROL,
+        CACHE_STATUS_HEADER: cache_status,
+    }
+    if _etag_matches(request.headers.get("if-none-match"), entry["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    """Serve cached JSON for a namespace, building it on a miss"""
+
+    def __init__(self, backend: CacheBackend, ttl: int = RESPONSE_CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self._on_invalidate = []
+
+    async def respond(
+        self,
+        request: Request,
+        namespace: str,
+        build: Callable[[], Awaitable[Tuple[object, Dict[str, str]]]],
+    ) -> Response:
+        """Return the cached response for this request, or build and store it.
+
+        `build` returns the content (trusted documents) and any extra headers.
+        """
+        version = await self.backend.get_version(namespace)
+        query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+        key = f"{namespace}:{version}:{request.url.path}?{query}"
+
+        entry = await self.backend.get(key)
+        cache_status = "HIT"
+        if entry is None:
+            cache_status = "MISS"
+            content, headers = await build()
+            entry = make_entry(content, headers)
+            await self.backend.set(key, entry, self.ttl)
+
+        return entry_response(request, entry, cache_status)
+
+    def on_invalidate(self, callback: Callable[[str], None]):
+        """Register `callback(namespace)` to run after each local invalidation"""
+        self._on_invalidate.append(callback)
+
+    async def invalidate(self, namespace: str):
+        await self.backend.bump_version(namespace)
+        for callback in self._on_invalidate:
+            callback(namespace)
@@ -0,0 +1,164 @@
+"""Prefix search with facet counts over admissions and contacts.
+
+Mongo text indexes only match whole stemmed words, so each searchable
+document also stores `search_terms`: the lowercased prefixes (edge
+n-grams) of every token in its searchable fields. A multikey index on that
+array is the inverted index; a query matches when every query token is
+one of the document's prefixes, which `$all` answers from the index.
+
+Documents written before this existed are backfilled with:
+
+    python search.py --reindex
+"""
+import asyncio
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, Query
+from pymongo import UpdateOne
+
+from serialization import PUBLIC_PROJECTION
+
+SEARCH_FIELD = "search_terms"
+MIN_PREFIX = 2
+MAX_PREFIX = 20
+MAX_TERMS = 500
+REINDEX_BATCH_SIZE = 1000
+
+SEARCH_FIELDS = {
+    "admissions": ("student_name", "parent_name", "email", "phone", "grade"),
+    "contacts": ("name", "email", "subject", "message"),
+}
+FACET_FIELDS = {
+    "admissions": ("status", "grade"),
+    "contacts": ("subject",),
+}
+SORT_FIELDS = {
+    "admissions": "submitted_at",
+    "contacts": "created_at",
+}
+
+_TOKEN = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def search_terms(doc: dict, collection: str) -> List[str]:
+    """Every prefix (MIN_PREFIX..MAX_PREFIX chars) of every searchable token"""
+    terms = set()
+    for field in SEARCH_FIELDS[collection]:
+        for token in tokenize(str(doc.get(field) or "")):
+            for end in range(MIN_PREFIX, min(len(token), MAX_PREFIX) + 1):
+                terms.add(token[:end])
+                if len(terms) >= MAX_TERMS:
+                    return sorted(terms)
+    return sorted(terms)
+
+
+def with_search_terms(doc: dict, collection: str) -> dict:
+    """Return a copy of `doc` ready to insert, including its search terms"""
+    return {**doc, SEARCH_FIELD: search_terms(doc, collection)}
+
+
+class SearchParams:
+    """Query parameters for the search endpoints"""
+
+    def __init__(
+        self,
+        q: str = Query(..., min_length=MIN_PREFIX, max_length=200),
+        page: int = Query(1, ge=1),
+        limit: int = Query(20, ge=1, le=100),
+    ):
+        self.q = q
+        self.page = page
+        self.limit = limit
+
+
+async def search(collection, name: str, params: SearchParams, filters: Optional[Dict[str, str]] = None) -> dict:
+    """Run a prefix search, returning one page of results plus facet counts"""
+    terms = [token[:MAX_PREFIX] for token in tokenize(params.q) if len(token) >= MIN_PREFIX]
+    if not terms:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Search needs a word of at least {MIN_PREFIX} characters"
+        )
+
+    match = {SEARCH_FIELD: {"$all": sorted(set(terms))}}
+    match.update({k: v for k, v in (filters or {}).items() if v is not None})
+
+    facets = {
+        field: [{"$group": {"_id": f"${field}", "count": {"$sum": 1}}}, {"$sort": {"count": -1}}]
+        for field in FACET_FIELDS[name]
+    }
+    pipeline = [
+        {"$match": match},
+        {"$facet": {
+            "results": [
+                {"$sort": {SORT_FIELDS[name]: -1, "id": -1}},
+                {"$skip": (params.page - 1) * params.limit},
+                {"$limit": params.limit},
+                {"$project": PUBLIC_PROJECTION},
+            ],
+            "total": [{"$count": "count"}],
+            **facets,
+        }},
+    ]
+    result = (await collection.aggregate(pipeline).to_list(1))[0]
+
+    return {
+        "results": result["results"],
+        "total": result["total"][0]["count"] if result["total"] else 0,
+        "page": params.page,
+        "limit": params.limit,
+        "facets": {
+            field: {str(bucket["_id"]): bucket["count"] for bucket in result[field]}
+            for field in FACET_FIELDS[name]
+        },
+    }
+
+
+async def reindex(db, collection: str) -> int:
+    """Recompute search terms for every document in a collection"""
+    fields = {field: 1 for field in SEARCH_FIELDS[collection]}
+    cursor = db[collection].find({}, {"_id": 1, **fields}).batch_size(REINDEX_BATCH_SIZE)
+
+    updated = 0
+    batch = []
+    async for doc in cursor:
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {SEARCH_FIELD: search_terms(doc, collection)}}))
+        if len(batch) >= REINDEX_BATCH_SIZE:
+            await db[collection].bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        await db[collection].bulk_write(batch, ordered=False)
+        updated += len(batch)
+    return updated
+
+
+async def main(argv: List[str]) -> int:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    if "--reindex" not in argv:
+        print(__doc__)
+        return 2
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        for collection in SEARCH_FIELDS:
+            print(f"✓ Reindexed {await reindex(db, collection)} {collection}")
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(sys.argv[1:])))
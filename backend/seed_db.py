@@ -1,23 +1,303 @@
+"""Seed the database with the admin account and homepage content, and
+optionally generate synthetic users, admissions and contacts at volume.
+
+    python seed_db.py
+    python seed_db.py --users 1000000 --admissions 2000000 --contacts 500000
+        [--batch-size 5000] [--parallel 8] [--status-weights pending=6,approved=3,rejected=1]
+    python seed_db.py --resume
+
+Generated batches are built in worker processes and written with
+insert_many(ordered=False), `--parallel` batches at a time. Every document
+is a pure function of (seed, collection, position), and finished batches
+are recorded in the `seed_runs` collection, so `--resume` finishes an
+interrupted run without duplicating anything. All generated users share
+one password, hashed once up front.
+"""
+import argparse
 import asyncio
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+from bson import ObjectId
 from dotenv import load_dotenv
 from pathlib import Path
+from typing import Dict, List, Optional
 from auth import get_password_hash
-from datetime import datetime
+from indexes import ensure_indexes
+from stats import reconcile_counters
+from search import with_search_terms
+from write_queue import insert_ignoring_duplicates
+from datetime import datetime, timedelta
 import uuid
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-async def seed_database():
+# ==================== Synthetic Data ====================
+
+GRADES = ["Nursery", "LKG", "UKG"] + [f"Grade {n}" for n in range(1, 13)]
+STATUSES = ["pending", "approved", "rejected"]
+SUBJECTS = ["Admission enquiry", "Fee structure", "Transport", "Campus visit", "Other"]
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Diya", "Ananya", "Ishaan", "Saanvi", "Kabir", "Meera", "Rohan"]
+LAST_NAMES = ["Sharma", "Patel", "Iyer", "Reddy", "Nair", "Gupta", "Joshi", "Desai", "Kulkarni", "Rao"]
+
+# Bcrypt-shaped placeholder for benchmarks that never log in
+PASSWORD_HASH = "$2b$12$KIXQJ1z6v5Zq1a8h0m3eUOsW8bq3b9bWm6b0Wn0e8lW8nQeD9kR1e"
+GENERATED_PASSWORD = "password123"
+SEED_BATCH_SIZE = 5000
+
+
+@dataclass
+class Distribution:
+    """Knobs for generated data; stored with each run so a resume matches it"""
+    status_weights: Dict[str, float] = field(default_factory=lambda: {"pending": 5, "approved": 3, "rejected": 2})
+    grade_weights: Optional[Dict[str, float]] = None  # uniform over GRADES when unset
+    days: int = 365
+    # 1 spreads timestamps evenly over `days`; higher values favour recent ones
+    recency: float = 1.0
+    anchor: datetime = field(default_factory=datetime.utcnow)
+    password_hash: str = PASSWORD_HASH
+
+
+def _weighted(rng: random.Random, weights: Optional[Dict[str, float]], default: List[str]) -> str:
+    if not weights:
+        return rng.choice(default)
+    return rng.choices(list(weights), list(weights.values()))[0]
+
+
+def _name(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _timestamp(rng: random.Random, dist: Distribution) -> datetime:
+    age = dist.days * 86400 * rng.random() ** dist.recency
+    return dist.anchor - timedelta(seconds=int(age))
+
+
+def user(rng: random.Random, n: int, dist: Distribution) -> dict:
+    return {
+        "_id": ObjectId(),
+        "id": _uuid(rng),
+        "email": f"user{n}@example.com",
+        "password": dist.password_hash,
+        "name": _name(rng),
+        "phone": f"+91 {rng.randrange(10**9, 10**10)}",
+        "role": "user",
+        "created_at": _timestamp(rng, dist),
+    }
+
+
+def admission(rng: random.Random, n: int, dist: Distribution) -> dict:
+    return {
+        "_id": ObjectId(),
+        "id": _uuid(rng),
+        "student_name": _name(rng),
+        "parent_name": _name(rng),
+        "email": f"parent{n}@example.com",
+        "phone": f"+91 {rng.randrange(10**9, 10**10)}",
+        "grade": _weighted(rng, dist.grade_weights, GRADES),
+        "dob": f"{rng.randrange(2008, 2021)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}",
+        "address": f"{rng.randrange(1, 999)} MG Road, Pune",
+        "previous_school": rng.choice(["", "St. Mary's", "DPS", "Kendriya Vidyalaya"]),
+        "status": _weighted(rng, dist.status_weights, STATUSES),
+        "submitted_at": _timestamp(rng, dist),
+    }
+
+
+def contact(rng: random.Random, n: int, dist: Distribution) -> dict:
+    return {
+        "_id": ObjectId(),
+        "id": _uuid(rng),
+        "name": _name(rng),
+        "email": f"visitor{n}@example.com",
+        "phone": f"+91 {rng.randrange(10**9, 10**10)}",
+        "subject": rng.choice(SUBJECTS),
+        "message": "I would like to know more about the admission process and fees.",
+        "created_at": _timestamp(rng, dist),
+    }
+
+
+def gallery(rng: random.Random, n: int, dist: Distribution) -> dict:
+    return {
+        "_id": ObjectId(),
+        "id": _uuid(rng),
+        "title": f"Campus photo {n}",
+        "image_url": f"https://images.example.com/{n}.jpg",
+        "category": rng.choice(["campus", "facilities", "students", "sports"]),
+        "uploaded_by": "admin@gurukulschool.net",
+        "created_at": _timestamp(rng, dist),
+    }
+
+
+def announcement(rng: random.Random, n: int, dist: Distribution) -> dict:
+    return {
+        "_id": ObjectId(),
+        "id": _uuid(rng),
+        "title": f"Announcement {n}",
+        "content": "Parents are requested to attend the meeting on Saturday.",
+        "category": rng.choice(["general", "events", "admissions", "achievements"]),
+        "is_active": rng.random() < 0.9,
+        "created_by": "admin@gurukulschool.net",
+        "created_at": _timestamp(rng, dist),
+    }
+
+
+GENERATORS = {
+    "users": user,
+    "admissions": admission,
+    "contacts": contact,
+    "gallery": gallery,
+    "announcements": announcement,
+}
+
+
+def generate(collection: str, count: int, seed: int = 0, dist: Optional[Distribution] = None) -> list:
+    """Generate `count` documents for a collection, reproducibly"""
+    rng = random.Random(seed)
+    dist = dist or Distribution()
+    make = GENERATORS[collection]
+    return [make(rng, n, dist) for n in range(count)]
+
+
+def build_batch(collection: str, start: int, size: int, seed: int, dist: Distribution) -> list:
+    """Documents start..start+size, the same on every call (runs in a worker process)"""
+    rng = random.Random(f"{seed}:{collection}:{start}")
+    make = GENERATORS[collection]
+    docs = [make(rng, n, dist) for n in range(start, start + size)]
+    if collection in ("admissions", "contacts"):
+        docs = [with_search_terms(doc, collection) for doc in docs]
+    return docs
+
+
+class Throughput:
+    """Inserted-document counter that prints progress every few seconds"""
+
+    def __init__(self, collection: str, total: int, interval: float = 2.0):
+        self.collection = collection
+        self.total = total
+        self.interval = interval
+        self.inserted = 0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    @property
+    def rate(self) -> float:
+        return self.inserted / max(time.perf_counter() - self.started, 1e-9)
+
+    def add(self, count: int):
+        self.inserted += count
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            print(f"  {self.collection}: {self.inserted:,}/{self.total:,} ({self.rate:,.0f} docs/s)")
+
+
+async def _start_run(runs, collection: str, count: int, args, dist: Distribution) -> dict:
+    """Record a new run; positions continue after earlier runs so emails stay unique"""
+    previous = await runs.find_one({"_id": collection})
+    if previous and not previous.get("finished"):
+        print(f"! Replacing unfinished {collection} run (use --resume to continue it instead)")
+    offset = previous["offset"] + previous["count"] if previous else 0
+    run = {
+        "_id": collection,
+        "offset": offset,
+        "count": count,
+        "batch_size": args.batch_size,
+        "seed": args.seed,
+        "distribution": asdict(dist),
+        "done": [],
+        "finished": False,
+        "started_at": datetime.utcnow(),
+    }
+    await runs.replace_one({"_id": collection}, run, upsert=True)
+    return run
+
+
+async def _generate_collection(db, pool, run: dict, parallel: int, password_hash: str) -> int:
+    collection = run["_id"]
+    dist = Distribution(**{**run["distribution"], "password_hash": password_hash})
+    done = set(run["done"])
+    batch_size = run["batch_size"]
+    batches = [
+        start for start in range(0, run["count"], batch_size)
+        if start not in done
+    ]
+    remaining = sum(min(batch_size, run["count"] - start) for start in batches)
+    meter = Throughput(collection, remaining)
+    semaphore = asyncio.Semaphore(parallel)
+    loop = asyncio.get_running_loop()
+
+    async def write(start: int):
+        async with semaphore:
+            size = min(batch_size, run["count"] - start)
+            docs = await loop.run_in_executor(
+                pool, build_batch, collection, run["offset"] + start, size, run["seed"], dist
+            )
+            # A batch cut short by a crash is rewritten; unique ids skip what landed
+            await insert_ignoring_duplicates(db[collection], docs)
+            await db.seed_runs.update_one({"_id": collection}, {"$addToSet": {"done": start}})
+            meter.add(size)
+
+    await asyncio.gather(*(write(start) for start in batches))
+    await db.seed_runs.update_one(
+        {"_id": collection}, {"$set": {"finished": True, "finished_at": datetime.utcnow()}}
+    )
+    elapsed = time.perf_counter() - meter.started
+    print(f"✓ Generated {meter.inserted:,} {collection} in {elapsed:.1f}s ({meter.rate:,.0f} docs/s)")
+    return meter.inserted
+
+
+async def generate_data(db, counts: Dict[str, int], args):
+    """Generate synthetic documents, or finish the runs left in seed_runs"""
+    if args.resume:
+        runs = await db.seed_runs.find({"finished": False}).to_list(None)
+        if not runs:
+            print("✓ No unfinished generation runs to resume")
+            return
+    else:
+        dist = Distribution(
+            status_weights=args.status_weights,
+            grade_weights=args.grade_weights,
+            days=args.days,
+            recency=args.recency,
+        )
+        runs = [await _start_run(db.seed_runs, name, count, args, dist) for name, count in counts.items()]
+
+    password_hash = PASSWORD_HASH
+    if any(run["_id"] == "users" for run in runs):
+        # bcrypt once; per-user hashing would take days at these volumes
+        password_hash = get_password_hash(GENERATED_PASSWORD)
+
+    started = time.perf_counter()
+    total = 0
+    with ProcessPoolExecutor(max_workers=args.parallel) as pool:
+        for run in runs:
+            total += await _generate_collection(db, pool, run, args.parallel, password_hash)
+    elapsed = time.perf_counter() - started
+    print(f"✓ Generation finished in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} docs/s overall)")
+    if any(run["_id"] == "users" for run in runs):
+        print(f"   Generated users - email: user<N>@example.com, password: {GENERATED_PASSWORD}")
+
+
+async def seed_database(args):
     # MongoDB connection
     mongo_url = os.environ['MONGO_URL']
-    client = AsyncIOMotorClient(mongo_url)
+    client = AsyncIOMotorClient(mongo_url, maxPoolSize=max(10, args.parallel * 2))
     db = client[os.environ['DB_NAME']]
     
     print("Starting database seeding...")
     
+    # Indexes first so the unique email constraint guards the inserts below
+    await ensure_indexes(db)
+    print("✓ Ensured collection indexes")
+    
     # Create admin user if not exists
     admin_exists = await db.users.find_one({"email": "admin@gurukulschool.net"})
     if not admin_exists:
@@ -53,8 +333,8 @@ async def seed_database():
             {"title": "Discussion", "image_url": "https://images.unsplash.com/photo-1522202176988-66273c2fd55f?w=400&h=300&fit=crop", "category": "students"}
         ]
         
-        for img in gallery_images:
-            gallery_item = {
+        gallery_items = [
+            {
                 "id": str(uuid.uuid4()),
                 "title": img["title"],
                 "image_url": img["image_url"],
@@ -62,7 +342,9 @@ async def seed_database():
                 "uploaded_by": "admin@gurukulschool.net",
                 "created_at": datetime.utcnow()
             }
-            await db.gallery.insert_one(gallery_item)
+            for img in gallery_images
+        ]
+        await db.gallery.insert_many(gallery_items)
         
         print(f"✓ Created {len(gallery_images)} gallery images")
     else:
@@ -106,11 +388,47 @@ async def seed_database():
     else:
         print(f"✓ Announcements already exist ({announcement_count} items)")
     
+    # Synthetic volume for staging and load tests
+    counts = {name: getattr(args, name) for name in GENERATORS if getattr(args, name)}
+    if counts or args.resume:
+        await generate_data(db, counts, args)
+    
+    # Everything above bypassed the API, so rebuild the dashboard counters
+    await reconcile_counters(db)
+    print("✓ Reconciled dashboard counters")
+    
     print("\n✅ Database seeding completed!")
     print("\n📝 Login credentials:")
     print("   Admin - email: admin@gurukulschool.net, password: admin123")
     
     client.close()
 
+def _weights(value: str) -> Dict[str, float]:
+    """"pending=6,approved=3" -> {"pending": 6.0, "approved": 3.0}"""
+    weights = {}
+    for part in value.split(","):
+        key, _, weight = part.partition("=")
+        weights[key.strip()] = float(weight)
+    return weights
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Seed the database and generate synthetic data")
+    for name in GENERATORS:
+        parser.add_argument(f"--{name}", type=int, default=0, help=f"number of {name} to generate")
+    parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE)
+    parser.add_argument("--parallel", type=int, default=os.cpu_count() or 4,
+                        help="batches generated and inserted concurrently")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--status-weights", type=_weights, default=Distribution().status_weights)
+    parser.add_argument("--grade-weights", type=_weights, default=None)
+    parser.add_argument("--days", type=int, default=365, help="spread timestamps over this many days")
+    parser.add_argument("--recency", type=float, default=1.0, help=">1 skews timestamps towards today")
+    parser.add_argument("--resume", action="store_true", help="finish unfinished runs from seed_runs")
+    args = parser.parse_args(argv)
+    if args.resume and any(getattr(args, name) for name in GENERATORS):
+        parser.error("--resume continues recorded runs; do not combine it with counts")
+    return args
+
 if __name__ == "__main__":
-    asyncio.run(seed_database())
+    asyncio.run(seed_database(parse_args()))
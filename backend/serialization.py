@@ -0,0 +1,60 @@
+"""Fast JSON serialization for documents read back from Mongo.
+
+Documents written by these routes were validated by the Pydantic models on
+the way in, so list routes project away `_id`/`password` in the query and
+encode the raw documents in one pass instead of rebuilding a model per
+document and having FastAPI validate the response a second time.
+
+orjson is used when installed (it encodes datetimes natively); otherwise
+this falls back to the standard library encoder with the same output.
+"""
+import json
+import time
+from datetime import date, datetime
+
+from fastapi.responses import Response
+
+from metrics import SERIALIZE_SECONDS
+from profiling import record
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# Projections that shape stored documents exactly like their response model
+# (`search_terms` is the prefix index maintained by search.py)
+PUBLIC_PROJECTION = {"_id": 0, "search_terms": 0}
+USER_PROJECTION = {"_id": 0, "password": 0}
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    """Encode trusted documents (dicts, lists, datetimes) to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class TrustedJSONResponse(Response):
+    """JSON response for database documents that skips response validation"""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        started = time.perf_counter()
+        try:
+            return dumps(content)
+        finally:
+            elapsed = time.perf_counter() - started
+            SERIALIZE_SECONDS.observe(elapsed)
+            record("serialize", elapsed)
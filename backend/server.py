@@ -1,38 +1,143 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status
+from fastapi import FastAPI, APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from contextlib import asynccontextmanager
 import os
+import asyncio
 import logging
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 from models import (
     UserCreate, UserLogin, User, Token,
-    AdmissionCreate, Admission, AdmissionStatusUpdate,
+    AdmissionCreate, Admission, AdmissionStatusUpdate, AdmissionBulkStatusUpdate,
     ContactCreate, Contact,
     GalleryCreate, Gallery,
-    AnnouncementCreate, Announcement, AnnouncementUpdate
+    AnnouncementCreate, Announcement, AnnouncementUpdate,
+    BulkDelete, BulkResult
 )
 from auth import (
-    get_password_hash, verify_password, create_access_token,
-    get_current_user, get_current_admin
+    create_access_token, get_current_user, get_current_admin,
+    token_claims, profile_from_claims, token_revocations, is_admin_authorization
+)
+from passwords import password_hasher
+from pagination import PageParams, paginate, fetch_page, TOTAL_COUNT_HEADER, NEXT_CURSOR_HEADER
+from indexes import ensure_indexes
+from stats import (
+    load_dashboard_stats, ensure_counters, reconcile_counters, record_users,
+    record_admissions, record_status_changes, record_contacts, record_gallery
+)
+from response_cache import ResponseCache, make_backend
+from serialization import TrustedJSONResponse, PUBLIC_PROJECTION, USER_PROJECTION
+from exports import ExportParams, stream_export
+from bulk import bulk_update_status, bulk_delete
+from search import SearchParams, search, with_search_terms
+from write_queue import WriteBehindQueue, WRITE_BEHIND_ENABLED, WRITE_JOURNAL_DIR
+from rate_limit import RateLimitMiddleware, make_rate_limiter
+from metrics import MetricsMiddleware, monitor_loop_lag, pool_monitor, registry, render
+from database import Database, DatabaseProxy
+from live import LiveFeed
+from home import HomeBundle
+from archive import Archiver, archive_name
+from profiling import ProfilingMiddleware, profile_log, PROFILE_ID_HEADER
+from idempotency import IdempotencyMiddleware, IdempotencyStore, REPLAYED_HEADER
+from media import (
+    MediaPipeline, ImmutableStaticFiles, make_storage, srcset,
+    IMAGE_WORKERS, MEDIA_STORAGE, MEDIA_ROOT, MEDIA_URL
 )
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# MongoDB connection, opened per worker in the lifespan below
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
-
-# Create the main app without a prefix
-app = FastAPI()
-
-# Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+database = Database(mongo_url, os.environ['DB_NAME'])
+db = DatabaseProxy(database)
+# Public GETs, which MONGO_PUBLIC_READ_PREFERENCE may send to secondaries
+public_db = DatabaseProxy(database, "public_db")
+
+# Serialized responses for the public homepage routes
+response_cache = ResponseCache(make_backend(db))
+
+# GET /api/home payload, rebuilt whenever gallery/announcements are invalidated.
+# Read from the primary: the rebuild runs right after a write, which a
+# lagging secondary may not have yet.
+home_bundle = HomeBundle(db, response_cache)
+
+# Public form submissions are acknowledged once journaled, then batch-inserted
+write_queue = WriteBehindQueue(db, WRITE_JOURNAL_DIR, enabled=WRITE_BEHIND_ENABLED)
+
+# Token buckets and load shedding for the public routes
+rate_limiter = make_rate_limiter(db)
+
+# Uploaded gallery images and their resized variants
+media_pipeline = MediaPipeline(make_storage(), IMAGE_WORKERS)
+
+# Change-stream (or polling) feed behind the admin live-updates stream
+live_feed = LiveFeed(db)
+
+# Moves processed admissions and old contacts into the *_archive collections
+archiver = Archiver(db)
+
+# Stored responses for POST retries carrying an Idempotency-Key
+idempotency_store = IdempotencyStore(db)
+
+# Gauges read from the components above at scrape time
+registry.gauge("requests_in_flight", "Requests currently being handled", lambda: rate_limiter.in_flight)
+registry.gauge("requests_shed", "Requests refused with 503 by load shedding", lambda: rate_limiter.shed)
+registry.gauge("password_hash_pending", "bcrypt calls running or queued", lambda: password_hasher.snapshot()["pending"])
+registry.gauge("write_queue_pending", "Submissions journaled but not yet in Mongo", lambda: write_queue.pending)
+registry.gauge("live_update_subscribers", "Open admin live-update streams", lambda: live_feed.subscribers)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    routers = app.state.routers
+    database.connect()
+    # Independent of each other, so run concurrently to shorten worker startup.
+    # ensure_counters needs no index from ensure_indexes: it reads the stats
+    # document by _id and only counts the collections when that document is
+    # missing, i.e. on a fresh database. The write queue waits for all of
+    # them: its journal replay relies on the unique indexes and updates the
+    # counters.
+    await asyncio.gather(
+        ensure_indexes(db),
+        response_cache.backend.setup(),
+        rate_limiter.setup(),
+        idempotency_store.setup(),
+        ensure_counters(db),
+        token_revocations.start(db),
+    )
+    await write_queue.start()
+    if "admin" in routers:
+        live_feed.start()
+    archiver.start()
+    if "home" in routers:
+        home_bundle.refresh()
+    loop_lag_task = asyncio.create_task(monitor_loop_lag())
+    yield
+    loop_lag_task.cancel()
+    await live_feed.close()
+    await archiver.close()
+    await home_bundle.close()
+    await token_revocations.close()
+    password_hasher.shutdown()
+    await media_pipeline.shutdown()
+    await write_queue.close()
+    database.close()
+
+# One /api router per feature; create_app() includes the ones this worker serves
+auth_router = APIRouter(prefix="/api")
+admin_router = APIRouter(prefix="/api")
+admissions_router = APIRouter(prefix="/api")
+contact_router = APIRouter(prefix="/api")
+gallery_router = APIRouter(prefix="/api")
+announcements_router = APIRouter(prefix="/api")
+home_router = APIRouter(prefix="/api")
+ops_router = APIRouter(prefix="/api")
 
 # Configure logging
 logging.basicConfig(
@@ -43,7 +148,14 @@ logger = logging.getLogger(__name__)
 
 # ==================== Authentication Routes ====================
 
-@api_router.post("/auth/register", response_model=Token)
+async def check_password(user: dict, password: str) -> bool:
+    """Verify a login password, upgrading the stored hash if it is outdated"""
+    valid, new_hash = await password_hasher.verify(password, user["password"])
+    if valid and new_hash:
+        await db.users.update_one({"id": user["id"]}, {"$set": {"password": new_hash}})
+    return valid
+
+@auth_router.post("/auth/register", response_model=Token)
 async def register(user_data: UserCreate):
     """Register a new user"""
     # Check if user already exists
@@ -55,7 +167,7 @@ async def register(user_data: UserCreate):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     user = User(
         email=user_data.email,
         name=user_data.name,
@@ -66,45 +178,53 @@ async def register(user_data: UserCreate):
     user_dict = user.dict()
     user_dict["password"] = hashed_password
     
-    await db.users.insert_one(user_dict)
+    try:
+        await db.users.insert_one(user_dict)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent registration for the same email
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    await record_users(db, 1)
     
     # Create access token
-    access_token = create_access_token(
-        data={"sub": user.email, "role": user.role}
-    )
+    access_token = create_access_token(data=token_claims(user_dict))
     
     return Token(access_token=access_token, token_type="bearer", user=user)
 
-@api_router.post("/auth/login", response_model=Token)
+@auth_router.post("/auth/login", response_model=Token)
 async def login(credentials: UserLogin):
     """Login user"""
     user = await db.users.find_one({"email": credentials.email})
     
-    if not user or not verify_password(credentials.password, user["password"]):
+    if not user or not await check_password(user, credentials.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
     # Create access token
-    access_token = create_access_token(
-        data={"sub": user["email"], "role": user["role"]}
-    )
+    access_token = create_access_token(data=token_claims(user))
     
     user_obj = User(**{k: v for k, v in user.items() if k != "password"})
     
     return Token(access_token=access_token, token_type="bearer", user=user_obj)
 
-@api_router.get("/auth/me", response_model=User)
+@auth_router.get("/auth/me", response_model=User)
 async def get_me(current_user: dict = Depends(get_current_user)):
     """Get current user profile"""
-    user = await db.users.find_one({"email": current_user["sub"]})
+    profile = profile_from_claims(current_user)
+    if profile:
+        return User(**profile)
+    
+    user = await db.users.find_one({"email": current_user["sub"]}, USER_PROJECTION)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return User(**{k: v for k, v in user.items() if k != "password"})
+    return User(**user)
 
-@api_router.put("/auth/profile", response_model=User)
+@auth_router.put("/auth/profile", response_model=User)
 async def update_profile(
     name: str = None,
     phone: str = None,
@@ -117,136 +237,275 @@ async def update_profile(
     if phone:
         update_data["phone"] = phone
     
+    projection = USER_PROJECTION
     if update_data:
-        await db.users.update_one(
+        user = await db.users.find_one_and_update(
             {"email": current_user["sub"]},
-            {"$set": update_data}
+            {"$set": update_data},
+            projection=projection,
+            return_document=ReturnDocument.AFTER
         )
+        # Tokens issued before now carry the old name/phone claims
+        await token_revocations.mark_profile_changed(current_user["sub"])
+    else:
+        user = await db.users.find_one({"email": current_user["sub"]}, projection)
     
-    user = await db.users.find_one({"email": current_user["sub"]})
-    return User(**{k: v for k, v in user.items() if k != "password"})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return User(**user)
 
 # ==================== Admin Routes ====================
 
-@api_router.post("/admin/login", response_model=Token)
+@admin_router.post("/admin/login", response_model=Token)
 async def admin_login(credentials: UserLogin):
     """Admin login"""
     user = await db.users.find_one({"email": credentials.email, "role": "admin"})
     
-    if not user or not verify_password(credentials.password, user["password"]):
+    if not user or not await check_password(user, credentials.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid admin credentials"
         )
     
-    access_token = create_access_token(
-        data={"sub": user["email"], "role": user["role"]}
-    )
+    access_token = create_access_token(data=token_claims(user))
     
     user_obj = User(**{k: v for k, v in user.items() if k != "password"})
     
     return Token(access_token=access_token, token_type="bearer", user=user_obj)
 
-@api_router.get("/admin/dashboard")
+@admin_router.get("/admin/dashboard")
 async def get_dashboard_stats(current_user: dict = Depends(get_current_admin)):
     """Get dashboard statistics"""
-    total_users = await db.users.count_documents({"role": "user"})
-    total_admissions = await db.admissions.count_documents({})
-    pending_admissions = await db.admissions.count_documents({"status": "pending"})
-    total_contacts = await db.contacts.count_documents({})
-    total_gallery = await db.gallery.count_documents({})
-    
+    return await load_dashboard_stats(db)
+
+@admin_router.post("/admin/stats/reconcile")
+async def reconcile_dashboard_stats(current_user: dict = Depends(get_current_admin)):
+    """Recompute the dashboard counters from the collections (admin only)"""
+    return {"drift": await reconcile_counters(db)}
+
+@admin_router.get("/admin/profiles")
+async def list_profiles(current_user: dict = Depends(get_current_admin)):
+    """Slow and explicitly profiled requests held by this worker, newest first (admin only)"""
+    return TrustedJSONResponse(profile_log.list())
+
+@admin_router.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, current_user: dict = Depends(get_current_admin)):
+    """Timings, Mongo commands, sizes and samples of one captured request (admin only)"""
+    profile = profile_log.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found (it may have been evicted or belong to another worker)")
+    return TrustedJSONResponse(profile)
+
+@admin_router.get("/admin/live")
+async def live_updates(current_user: dict = Depends(get_current_admin)):
+    """Stream new submissions and status changes as Server-Sent Events (admin only)"""
+    return StreamingResponse(
+        live_feed.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@admin_router.get("/admin/limits")
+async def get_limiter_state(current_user: dict = Depends(get_current_admin)):
+    """Get rate limiter and password pool state (admin only)"""
     return {
-        "total_users": total_users,
-        "total_admissions": total_admissions,
-        "pending_admissions": pending_admissions,
-        "total_contacts": total_contacts,
-        "total_gallery": total_gallery,
-        "stats": {
-            "students": 6000,
-            "faculty": 400,
-            "years": 7,
-            "ratio": "35:1",
-            "satisfaction": "100%"
-        }
+        "rate_limits": rate_limiter.snapshot(),
+        "password_hashing": password_hasher.snapshot(),
     }
 
-@api_router.get("/admin/users", response_model=List[User])
-async def get_all_users(current_user: dict = Depends(get_current_admin)):
-    """Get all users (admin only)"""
-    users = await db.users.find({"role": "user"}).to_list(1000)
-    return [User(**{k: v for k, v in user.items() if k != "password"}) for user in users]
+@admin_router.get("/admin/users", response_model=List[User])
+async def get_all_users(
+    page: PageParams = Depends(),
+    current_user: dict = Depends(get_current_admin)
+):
+    """Get a page of users (admin only)"""
+    return await paginate(
+        db.users, {"role": "user"}, page,
+        model=User, sort_field="created_at", exclude=("password",)
+    )
 
-@api_router.delete("/admin/users/{user_id}")
+@admin_router.delete("/admin/users/{user_id}")
 async def delete_user(user_id: str, current_user: dict = Depends(get_current_admin)):
     """Delete a user (admin only)"""
-    result = await db.users.delete_one({"id": user_id})
-    if result.deleted_count == 0:
+    user = await db.users.find_one_and_delete({"id": user_id}, projection={"email": 1, "role": 1})
+    if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    # Cached and still-unexpired tokens for this user stop working now
+    await token_revocations.revoke(user["email"])
+    if user.get("role") == "user":
+        await record_users(db, -1)
     return {"message": "User deleted successfully"}
 
+@admin_router.post("/admin/users/bulk-delete", response_model=BulkResult)
+async def bulk_delete_users(request: BulkDelete, current_user: dict = Depends(get_current_admin)):
+    """Delete many users in one request (admin only)"""
+    result, deleted = await bulk_delete(db.users, request.ids, fields=("email", "role"))
+    for user in deleted:
+        await token_revocations.revoke(user["email"])
+    if result.modified == len(deleted):
+        await record_users(db, -sum(1 for user in deleted if user.get("role") == "user"))
+    else:
+        # A concurrent delete removed some of these and counted them itself
+        await reconcile_counters(db)
+    return result
+
 # ==================== Admission Routes ====================
 
-@api_router.post("/admissions", response_model=Admission)
+@admissions_router.post("/admissions", response_model=Admission)
 async def submit_admission(admission_data: AdmissionCreate):
     """Submit admission application"""
     admission = Admission(**admission_data.dict())
-    await db.admissions.insert_one(admission.dict())
+    await write_queue.submit("admissions", with_search_terms(admission.dict(), "admissions"))
     return admission
 
-@api_router.get("/admissions", response_model=List[Admission])
-async def get_all_admissions(current_user: dict = Depends(get_current_admin)):
-    """Get all admission applications (admin only)"""
-    admissions = await db.admissions.find().to_list(1000)
-    return [Admission(**admission) for admission in admissions]
+@admissions_router.get("/admissions", response_model=List[Admission])
+async def get_all_admissions(
+    page: PageParams = Depends(),
+    include_archived: bool = False,
+    current_user: dict = Depends(get_current_admin)
+):
+    """Get a page of admission applications (admin only)"""
+    return await paginate(
+        db.admissions, {}, page,
+        model=Admission, sort_field="submitted_at",
+        archive=db[archive_name("admissions")] if include_archived else None
+    )
+
+@admissions_router.get("/admissions/export")
+async def export_admissions(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    params: ExportParams = Depends(),
+    current_user: dict = Depends(get_current_admin)
+):
+    """Stream admission applications as CSV or NDJSON (admin only)"""
+    query = {"status": status_filter} if status_filter else {}
+    return stream_export(
+        db.admissions, query, params,
+        model=Admission, date_field="submitted_at", filename="admissions"
+    )
+
+@admissions_router.get("/admissions/search")
+async def search_admissions(
+    params: SearchParams = Depends(),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    grade: Optional[str] = None,
+    current_user: dict = Depends(get_current_admin)
+):
+    """Prefix-search admission applications with status/grade facets (admin only)"""
+    result = await search(
+        db.admissions, "admissions", params,
+        filters={"status": status_filter, "grade": grade}
+    )
+    return TrustedJSONResponse(result)
 
-@api_router.get("/admissions/{admission_id}", response_model=Admission)
-async def get_admission(admission_id: str, current_user: dict = Depends(get_current_user)):
+@admissions_router.get("/admissions/{admission_id}", response_model=Admission)
+async def get_admission(
+    admission_id: str,
+    include_archived: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
     """Get specific admission application"""
-    admission = await db.admissions.find_one({"id": admission_id})
+    admission = await db.admissions.find_one({"id": admission_id}, PUBLIC_PROJECTION)
+    if not admission and include_archived:
+        admission = await db[archive_name("admissions")].find_one({"id": admission_id}, PUBLIC_PROJECTION)
     if not admission:
         raise HTTPException(status_code=404, detail="Admission not found")
-    return Admission(**admission)
+    return TrustedJSONResponse(admission)
 
-@api_router.put("/admissions/{admission_id}/status")
+@admissions_router.put("/admissions/{admission_id}/status")
 async def update_admission_status(
     admission_id: str,
     status_update: AdmissionStatusUpdate,
     current_user: dict = Depends(get_current_admin)
 ):
     """Update admission status (admin only)"""
-    result = await db.admissions.update_one(
-        {"id": admission_id},
-        {"$set": {"status": status_update.status}}
+    # Returns the previous status so the counters can move between buckets
+    previous = await db.admissions.find_one_and_update(
+        {"id": admission_id, "status": {"$ne": status_update.status}},
+        {"$set": {"status": status_update.status}},
+        projection={"_id": 0, "status": 1}
     )
-    if result.modified_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Admission not found")
+    await record_status_changes(db, [{"from": previous["status"], "to": status_update.status}])
+    live_feed.publish_update("admissions", {"id": admission_id, "status": status_update.status})
     return {"message": "Status updated successfully"}
 
+@admissions_router.post("/admissions/bulk-status", response_model=BulkResult)
+async def bulk_update_admission_status(
+    request: AdmissionBulkStatusUpdate,
+    current_user: dict = Depends(get_current_admin)
+):
+    """Update the status of many admissions in one request (admin only)"""
+    result, transitions = await bulk_update_status(db.admissions, request)
+    if result.modified:
+        if transitions:
+            await record_status_changes(db, transitions)
+            for transition in transitions:
+                live_feed.publish_update("admissions", {"id": transition["id"], "status": transition["to"]})
+        else:
+            # Filter mode, or a concurrent change, leaves the moves unattributed; recount
+            await reconcile_counters(db)
+            live_feed.publish_resync()
+    return result
+
 # ==================== Contact Routes ====================
 
-@api_router.post("/contact", response_model=Contact)
+@contact_router.post("/contact", response_model=Contact)
 async def submit_contact(contact_data: ContactCreate):
     """Submit contact form"""
     contact = Contact(**contact_data.dict())
-    await db.contacts.insert_one(contact.dict())
+    await write_queue.submit("contacts", with_search_terms(contact.dict(), "contacts"))
     return contact
 
-@api_router.get("/contact", response_model=List[Contact])
-async def get_all_contacts(current_user: dict = Depends(get_current_admin)):
-    """Get all contact submissions (admin only)"""
-    contacts = await db.contacts.find().to_list(1000)
-    return [Contact(**contact) for contact in contacts]
+@contact_router.get("/contact", response_model=List[Contact])
+async def get_all_contacts(
+    page: PageParams = Depends(),
+    include_archived: bool = False,
+    current_user: dict = Depends(get_current_admin)
+):
+    """Get a page of contact submissions (admin only)"""
+    return await paginate(
+        db.contacts, {}, page,
+        model=Contact, sort_field="created_at",
+        archive=db[archive_name("contacts")] if include_archived else None
+    )
+
+@contact_router.get("/contact/search")
+async def search_contacts(
+    params: SearchParams = Depends(),
+    subject: Optional[str] = None,
+    current_user: dict = Depends(get_current_admin)
+):
+    """Prefix-search contact submissions with subject facets (admin only)"""
+    result = await search(db.contacts, "contacts", params, filters={"subject": subject})
+    return TrustedJSONResponse(result)
+
+@contact_router.get("/contact/export")
+async def export_contacts(
+    params: ExportParams = Depends(),
+    current_user: dict = Depends(get_current_admin)
+):
+    """Stream contact submissions as CSV or NDJSON (admin only)"""
+    return stream_export(
+        db.contacts, {}, params,
+        model=Contact, date_field="created_at", filename="contacts"
+    )
 
 # ==================== Gallery Routes ====================
 
-@api_router.get("/gallery", response_model=List[Gallery])
-async def get_gallery():
-    """Get all gallery images"""
-    images = await db.gallery.find().to_list(1000)
-    return [Gallery(**image) for image in images]
+@gallery_router.get("/gallery", response_model=List[Gallery])
+async def get_gallery(request: Request, page: PageParams = Depends()):
+    """Get a page of gallery images"""
+    async def build():
+        docs, headers = await fetch_page(
+            public_db.gallery, {}, page, model=Gallery, sort_field="created_at"
+        )
+        return docs, headers
+    
+    return await response_cache.respond(request, "gallery", build)
 
-@api_router.post("/gallery", response_model=Gallery)
+@gallery_router.post("/gallery", response_model=Gallery)
 async def add_gallery_image(
     gallery_data: GalleryCreate,
     current_user: dict = Depends(get_current_admin)
@@ -254,9 +513,48 @@ async def add_gallery_image(
     """Add new gallery image (admin only)"""
     gallery = Gallery(**gallery_data.dict(), uploaded_by=current_user["sub"])
     await db.gallery.insert_one(gallery.dict())
+    await record_gallery(db, 1)
+    await response_cache.invalidate("gallery")
+    return gallery
+
+@gallery_router.post("/gallery/upload", response_model=Gallery)
+async def upload_gallery_image(
+    file: UploadFile = File(...),
+    title: str = Form(...),
+    category: str = Form("campus"),
+    current_user: dict = Depends(get_current_admin)
+):
+    """Upload a gallery image; resized variants are added in the background (admin only)"""
+    stored = await media_pipeline.store_upload(file)
+    
+    # Same bytes uploaded before: reuse that entry and its variants
+    existing = await db.gallery.find_one({"content_hash": stored["content_hash"]}, PUBLIC_PROJECTION)
+    if existing:
+        media_pipeline.discard(stored)
+        return TrustedJSONResponse(existing)
+    
+    gallery = Gallery(
+        title=title,
+        image_url=stored["url"],
+        category=category,
+        uploaded_by=current_user["sub"],
+        content_hash=stored["content_hash"]
+    )
+    await db.gallery.insert_one(gallery.dict())
+    await record_gallery(db, 1)
+    await response_cache.invalidate("gallery")
+    
+    async def save_variants(variants):
+        await db.gallery.update_one(
+            {"id": gallery.id},
+            {"$set": {"variants": variants, "srcset": srcset(variants)}}
+        )
+        await response_cache.invalidate("gallery")
+    
+    media_pipeline.process(stored, save_variants)
     return gallery
 
-@api_router.delete("/gallery/{image_id}")
+@gallery_router.delete("/gallery/{image_id}")
 async def delete_gallery_image(
     image_id: str,
     current_user: dict = Depends(get_current_admin)
@@ -265,17 +563,37 @@ async def delete_gallery_image(
     result = await db.gallery.delete_one({"id": image_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Image not found")
+    await record_gallery(db, -1)
+    await response_cache.invalidate("gallery")
     return {"message": "Image deleted successfully"}
 
+@gallery_router.post("/gallery/bulk-delete", response_model=BulkResult)
+async def bulk_delete_gallery_images(request: BulkDelete, current_user: dict = Depends(get_current_admin)):
+    """Delete many gallery images in one request (admin only)"""
+    result, deleted = await bulk_delete(db.gallery, request.ids)
+    if deleted:
+        if result.modified == len(deleted):
+            await record_gallery(db, -len(deleted))
+        else:
+            await reconcile_counters(db)
+        await response_cache.invalidate("gallery")
+    return result
+
 # ==================== Announcement Routes ====================
 
-@api_router.get("/announcements", response_model=List[Announcement])
-async def get_announcements():
-    """Get all active announcements"""
-    announcements = await db.announcements.find({"is_active": True}).to_list(1000)
-    return [Announcement(**announcement) for announcement in announcements]
+@announcements_router.get("/announcements", response_model=List[Announcement])
+async def get_announcements(request: Request, page: PageParams = Depends()):
+    """Get a page of active announcements"""
+    async def build():
+        docs, headers = await fetch_page(
+            public_db.announcements, {"is_active": True}, page,
+            model=Announcement, sort_field="created_at"
+        )
+        return docs, headers
+    
+    return await response_cache.respond(request, "announcements", build)
 
-@api_router.post("/announcements", response_model=Announcement)
+@announcements_router.post("/announcements", response_model=Announcement)
 async def create_announcement(
     announcement_data: AnnouncementCreate,
     current_user: dict = Depends(get_current_admin)
@@ -283,9 +601,10 @@ async def create_announcement(
     """Create new announcement (admin only)"""
     announcement = Announcement(**announcement_data.dict(), created_by=current_user["sub"])
     await db.announcements.insert_one(announcement.dict())
+    await response_cache.invalidate("announcements")
     return announcement
 
-@api_router.put("/announcements/{announcement_id}", response_model=Announcement)
+@announcements_router.put("/announcements/{announcement_id}", response_model=Announcement)
 async def update_announcement(
     announcement_id: str,
     update_data: AnnouncementUpdate,
@@ -301,11 +620,14 @@ async def update_announcement(
         )
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Announcement not found")
+        await response_cache.invalidate("announcements")
     
     announcement = await db.announcements.find_one({"id": announcement_id})
+    if update_dict:
+        live_feed.publish_update("announcements", {"id": announcement_id, **update_dict})
     return Announcement(**announcement)
 
-@api_router.delete("/announcements/{announcement_id}")
+@announcements_router.delete("/announcements/{announcement_id}")
 async def delete_announcement(
     announcement_id: str,
     current_user: dict = Depends(get_current_admin)
@@ -314,25 +636,123 @@ async def delete_announcement(
     result = await db.announcements.delete_one({"id": announcement_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Announcement not found")
+    await response_cache.invalidate("announcements")
     return {"message": "Announcement deleted successfully"}
 
+@announcements_router.post("/announcements/bulk-delete", response_model=BulkResult)
+async def bulk_delete_announcements(request: BulkDelete, current_user: dict = Depends(get_current_admin)):
+    """Delete many announcements in one request (admin only)"""
+    result, deleted = await bulk_delete(db.announcements, request.ids)
+    if deleted:
+        await response_cache.invalidate("announcements")
+    return result
+
+# ==================== Health & Metrics Routes ====================
+
+@ops_router.get("/health")
+async def health_check():
+    """Readiness probe: pings Mongo and reports this worker's pool usage"""
+    mongo = await database.health()
+    body = {
+        "status": "ok" if mongo["ok"] else "unavailable",
+        "mongo": mongo,
+        "pool": pool_monitor.snapshot(),
+        "write_queue_pending": write_queue.pending,
+    }
+    return JSONResponse(body, status_code=200 if mongo["ok"] else 503)
+
+@ops_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics for this worker"""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+# ==================== Home Route ====================
+
+@home_router.get("/home")
+async def get_home(request: Request):
+    """Latest gallery images, active announcements and school stats in one response"""
+    return await home_bundle.respond(request)
+
 # ==================== Root Route ====================
 
-@api_router.get("/")
+@ops_router.get("/")
 async def root():
     return {"message": "Gurukul School API is running"}
 
-# Include the router in the main app
-app.include_router(api_router)
+# ==================== App Factory ====================
+
+ROUTERS = {
+    "auth": auth_router,
+    "admin": admin_router,
+    "admissions": admissions_router,
+    "contact": contact_router,
+    "gallery": gallery_router,
+    "announcements": announcements_router,
+    "home": home_router,
+    "ops": ops_router,
+}
+# Comma-separated subset of ROUTERS, e.g. "home,gallery,announcements,ops" for a public-only pool
+API_ROUTERS = os.getenv("API_ROUTERS", "all")
+
+def create_app(routers: Optional[str] = None) -> FastAPI:
+    """Build the ASGI app with the selected routers, media mount and middleware.
+
+    Run with `uvicorn --factory server:create_app` so each worker builds
+    its own app; `server:app` also works and builds it on first access.
+    """
+    selected = (routers or API_ROUTERS).replace(" ", "")
+    names = list(ROUTERS) if selected == "all" else selected.split(",")
+    unknown = set(names) - set(ROUTERS)
+    if unknown:
+        raise ValueError(f"Unknown API_ROUTERS: {', '.join(sorted(unknown))}")
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.routers = names
+    for name in names:
+        app.include_router(ROUTERS[name])
+
+    if MEDIA_STORAGE == "local":
+        MEDIA_ROOT.mkdir(parents=True, exist_ok=True)
+        app.mount(MEDIA_URL, ImmutableStaticFiles(directory=MEDIA_ROOT), name="media")
+
+    # Innermost, so stored responses hold no per-origin CORS headers
+    app.add_middleware(IdempotencyMiddleware, store=idempotency_store)
+
+    # Added before CORS so that 429/503 responses still carry CORS headers
+    app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[TOTAL_COUNT_HEADER, NEXT_CURSOR_HEADER, REPLAYED_HEADER, PROFILE_ID_HEADER],
+    )
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    # Slow-request log and X-Profile sampling; inside metrics, around everything else
+    app.add_middleware(ProfilingMiddleware, authorize=is_admin_authorization)
+
+    # Outermost, so shed and rate-limited requests are counted too
+    app.add_middleware(MetricsMiddleware)
+    return app
+
+_app: Optional[FastAPI] = None
+
+def __getattr__(name: str):
+    # `server:app` for uvicorn and the benchmarks, built once on first access
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+async def submissions_written(collection: str, docs: list):
+    if collection == "admissions":
+        await record_admissions(db, docs)
+    elif collection == "contacts":
+        await record_contacts(db, docs)
+
+write_queue.on_flush(submissions_written)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
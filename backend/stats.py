@@ -0,0 +1,278 @@
+"""Dashboard statistics kept as precomputed counters.
+
+Every write that changes a counted collection applies an atomic `$inc` to
+the single `stats` document, so the dashboard is one find_one whatever the
+collection sizes. Status changes move an admission from one bucket to
+another, and submissions are counted per day for the histograms. Only the
+last STATS_HISTOGRAM_DAYS days are kept: increments for older days are
+skipped, and days that age out are unset when the dashboard is read.
+
+`reconcile_counters` recomputes everything from the collections and
+replaces the document, repairing drift from crashes between a write and
+its `$inc` or from changes made outside the API. Run it from cron:
+
+    python stats.py --reconcile
+
+or call POST /api/admin/stats/reconcile. It also runs at startup when the
+document does not exist yet.
+"""
+import asyncio
+import logging
+import os
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+STATS_HISTOGRAM_DAYS = int(os.getenv("STATS_HISTOGRAM_DAYS", "30"))
+STATS_COLLECTION = "stats"
+COUNTERS_ID = "dashboard"
+PER_DAY_FIELDS = ("admissions_per_day", "contacts_per_day")
+
+# Public school figures shown alongside the live counts
+SCHOOL_STATS = {
+    "students": 6000,
+    "faculty": 400,
+    "years": 7,
+    "ratio": "35:1",
+    "satisfaction": "100%"
+}
+
+ADMISSION_STATUSES = ("pending", "approved", "rejected")
+# Bucket for any other status string; keeps arbitrary input out of field paths
+OTHER_STATUS = "other"
+
+
+def _status_key(status) -> str:
+    return status if status in ADMISSION_STATUSES else OTHER_STATUS
+
+
+def _day(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d")
+
+
+def _histogram_start() -> datetime:
+    return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) \
+        - timedelta(days=STATS_HISTOGRAM_DAYS - 1)
+
+
+async def _inc(db, increments: Dict[str, int]):
+    increments = {field: n for field, n in increments.items() if n}
+    if increments:
+        await db[STATS_COLLECTION].update_one(
+            {"_id": COUNTERS_ID}, {"$inc": increments}, upsert=True
+        )
+
+
+# ==================== Write Hooks ====================
+
+async def record_users(db, delta: int):
+    """Registered (role "user") accounts were added or removed"""
+    await _inc(db, {"users": delta})
+
+
+async def record_admissions(db, docs: Iterable[dict], delta: int = 1):
+    """Admissions added (delta=1) or removed (delta=-1), counted by status and submission day"""
+    increments, first = Counter(), _day(_histogram_start())
+    for doc in docs:
+        increments[f"admissions.{_status_key(doc['status'])}"] += delta
+        day = _day(doc["submitted_at"])
+        if day >= first:  # older days are outside the histogram
+            increments[f"admissions_per_day.{day}"] += delta
+    await _inc(db, increments)
+
+
+async def record_status_changes(db, transitions: Iterable[dict]):
+    """Move admissions between status buckets; transitions are {"from", "to"}"""
+    increments = Counter()
+    for transition in transitions:
+        before, after = _status_key(transition["from"]), _status_key(transition["to"])
+        if before != after:
+            increments[f"admissions.{before}"] -= 1
+            increments[f"admissions.{after}"] += 1
+    await _inc(db, increments)
+
+
+async def record_contacts(db, docs: Iterable[dict], delta: int = 1):
+    """Contact messages added (delta=1) or removed (delta=-1), counted by day"""
+    increments, first = Counter(), _day(_histogram_start())
+    for doc in docs:
+        increments["contacts"] += delta
+        day = _day(doc["created_at"])
+        if day >= first:
+            increments[f"contacts_per_day.{day}"] += delta
+    await _inc(db, increments)
+
+
+async def record_gallery(db, delta: int):
+    await _inc(db, {"gallery": delta})
+
+
+# ==================== Reconciliation ====================
+
+def _per_day_facet(date_field: str, since: datetime) -> list:
+    return [
+        {"$match": {date_field: {"$gte": since}}},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": f"${date_field}"}},
+            "count": {"$sum": 1},
+        }},
+    ]
+
+
+async def _admission_counts(db, since: datetime) -> dict:
+    pipeline = [
+        {"$project": {"_id": 0, "status": 1, "submitted_at": 1}},
+        {"$facet": {
+            "by_status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+            "per_day": _per_day_facet("submitted_at", since),
+        }},
+    ]
+    result = (await db.admissions.aggregate(pipeline).to_list(1))[0]
+
+    by_status = {s: 0 for s in ADMISSION_STATUSES}
+    for bucket in result["by_status"]:
+        key = _status_key(bucket["_id"])
+        by_status[key] = by_status.get(key, 0) + bucket["count"]
+    return {
+        "by_status": by_status,
+        "per_day": {b["_id"]: b["count"] for b in result["per_day"]},
+    }
+
+
+async def _contact_counts(db, since: datetime) -> dict:
+    pipeline = [
+        {"$project": {"_id": 0, "created_at": 1}},
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "per_day": _per_day_facet("created_at", since),
+        }},
+    ]
+    result = (await db.contacts.aggregate(pipeline).to_list(1))[0]
+    return {
+        "total": result["total"][0]["count"] if result["total"] else 0,
+        "per_day": {b["_id"]: b["count"] for b in result["per_day"]},
+    }
+
+
+def _flatten(counters: dict) -> Dict[str, int]:
+    flat = {}
+    for field in ("users", "contacts", "gallery"):
+        flat[field] = counters.get(field, 0)
+    for status, count in counters.get("admissions", {}).items():
+        flat[f"admissions.{status}"] = count
+    return flat
+
+
+async def reconcile_counters(db) -> dict:
+    """Recompute every counter from the collections and replace the document.
+
+    Returns the drift that was corrected, as {counter: recomputed - stored}.
+    Writes that land while the aggregations run can be missed; the next
+    reconciliation picks them up.
+    """
+    since = _histogram_start()
+    stored, total_users, admissions, contacts, total_gallery = await asyncio.gather(
+        db[STATS_COLLECTION].find_one({"_id": COUNTERS_ID}),
+        db.users.count_documents({"role": "user"}),
+        _admission_counts(db, since),
+        _contact_counts(db, since),
+        db.gallery.count_documents({}),
+    )
+    counters = {
+        "users": total_users,
+        "admissions": admissions["by_status"],
+        "admissions_per_day": admissions["per_day"],
+        "contacts": contacts["total"],
+        "contacts_per_day": contacts["per_day"],
+        "gallery": total_gallery,
+        "reconciled_at": datetime.utcnow(),
+    }
+    await db[STATS_COLLECTION].replace_one({"_id": COUNTERS_ID}, counters, upsert=True)
+
+    before, after = _flatten(stored or {}), _flatten(counters)
+    drift = {
+        field: after.get(field, 0) - before.get(field, 0)
+        for field in sorted(set(before) | set(after))
+        if after.get(field, 0) != before.get(field, 0)
+    }
+    if stored is not None and drift:
+        logger.warning("Dashboard counters drifted: %s", drift)
+    return drift
+
+
+async def ensure_counters(db):
+    """Build the counters document if this database has never had one"""
+    if await db[STATS_COLLECTION].find_one({"_id": COUNTERS_ID}, {"_id": 1}) is None:
+        await reconcile_counters(db)
+
+
+# ==================== Dashboard Read ====================
+
+def _histogram(per_day: Dict[str, int], since: datetime) -> List[dict]:
+    first = _day(since)
+    return [
+        {"date": day, "count": count}
+        for day, count in sorted(per_day.items())
+        if day >= first and count
+    ]
+
+
+async def load_dashboard_stats(db) -> dict:
+    """Return dashboard figures from the precomputed counters document"""
+    counters = await db[STATS_COLLECTION].find_one({"_id": COUNTERS_ID})
+    if counters is None:
+        await reconcile_counters(db)
+        counters = await db[STATS_COLLECTION].find_one({"_id": COUNTERS_ID})
+
+    since = _histogram_start()
+    first = _day(since)
+    # Days that left the window would otherwise stay in the document forever
+    stale = {
+        f"{field}.{day}": ""
+        for field in PER_DAY_FIELDS for day in counters.get(field, {}) if day < first
+    }
+    if stale:
+        await db[STATS_COLLECTION].update_one({"_id": COUNTERS_ID}, {"$unset": stale})
+
+    by_status = {s: 0 for s in ADMISSION_STATUSES}
+    by_status.update(counters.get("admissions", {}))
+    return {
+        "total_users": counters.get("users", 0),
+        "total_admissions": sum(by_status.values()),
+        "pending_admissions": by_status["pending"],
+        "total_contacts": counters.get("contacts", 0),
+        "total_gallery": counters.get("gallery", 0),
+        "admissions_by_status": by_status,
+        "admissions_per_day": _histogram(counters.get("admissions_per_day", {}), since),
+        "contacts_per_day": _histogram(counters.get("contacts_per_day", {}), since),
+        "stats": SCHOOL_STATS,
+    }
+
+
+async def main(argv: List[str]) -> int:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    if "--reconcile" not in argv:
+        print("usage: python stats.py --reconcile")
+        return 2
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    try:
+        drift = await reconcile_counters(db)
+        print(f"✓ Reconciled dashboard counters ({'drift: ' + str(drift) if drift else 'no drift'})")
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(main(sys.argv[1:])))
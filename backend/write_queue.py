@@ -0,0 +1,310 @@
+"""Write-behind queue for the public form submissions.
+
+`submit` appends the document to an append-only journal and returns at
+once; a background task writes queued documents with insert_many when
+WRITE_BATCH_SIZE are waiting or WRITE_FLUSH_INTERVAL has passed. After
+each flush the journal is rewritten to hold only what is still pending.
+A document Mongo rejects (for anything but a duplicate id) is retried up
+to WRITE_MAX_ATTEMPTS times, then moved to `dead-letter.jsonl` in
+WRITE_JOURNAL_DIR so it stops holding up the rest of the queue.
+
+Each worker owns one journal file in WRITE_JOURNAL_DIR and holds an
+exclusive flock on it. At startup a worker adopts every journal it can
+lock, i.e. those left behind by workers that died: their entries move into
+its own journal and queue, and are written by the flush loop like any
+other submission, so startup does not depend on Mongo. Replays are
+idempotent because `id` has a unique index, so duplicate-key errors from
+documents that were already written are ignored.
+"""
+import asyncio
+import fcntl
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from bson import json_util
+from fastapi import HTTPException, status
+from pymongo.errors import BulkWriteError, ConnectionFailure, DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Queue configuration
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "true").lower() == "true"
+WRITE_JOURNAL_DIR = Path(os.getenv("WRITE_JOURNAL_DIR", Path(__file__).parent / "journal"))
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "500"))
+WRITE_FLUSH_INTERVAL = float(os.getenv("WRITE_FLUSH_INTERVAL", "0.05"))
+WRITE_QUEUE_MAX = int(os.getenv("WRITE_QUEUE_MAX", "50000"))
+WRITE_DRAIN_TIMEOUT = float(os.getenv("WRITE_DRAIN_TIMEOUT", "15"))
+# flush() survives a process crash; fsync also survives power loss, at ~1 ms per submit
+WRITE_JOURNAL_FSYNC = os.getenv("WRITE_JOURNAL_FSYNC", "false").lower() == "true"
+WRITE_MAX_ATTEMPTS = int(os.getenv("WRITE_MAX_ATTEMPTS", "5"))
+# Larger submissions are refused before they are journaled (Mongo's own limit is 16 MB)
+WRITE_MAX_DOCUMENT_BYTES = int(os.getenv("WRITE_MAX_DOCUMENT_BYTES", str(256 * 1024)))
+
+DUPLICATE_KEY = 11000
+MAX_RETRY_DELAY = 5.0
+DEAD_LETTER_FILE = "dead-letter.jsonl"
+
+
+def _split_write_errors(docs: List[dict], exc: BulkWriteError) -> Tuple[List[dict], Dict[int, str]]:
+    """(inserted docs, {index: error} of the non-duplicate failures) of an unordered insert_many"""
+    errors = exc.details.get("writeErrors", [])
+    rejected = {error["index"] for error in errors}
+    failed = {
+        error["index"]: error.get("errmsg", str(error["code"]))
+        for error in errors if error["code"] != DUPLICATE_KEY
+    }
+    return [doc for index, doc in enumerate(docs) if index not in rejected], failed
+
+
+async def insert_ignoring_duplicates(collection, docs: List[dict]) -> List[dict]:
+    """insert_many(ordered=False) that treats already-present ids as written.
+
+    Returns the documents this call actually inserted, so a replay does not
+    count documents that were already there.
+    """
+    try:
+        await collection.insert_many(docs, ordered=False)
+        return docs
+    except BulkWriteError as exc:
+        inserted, failed = _split_write_errors(docs, exc)
+        if failed:
+            raise
+        return inserted
+
+
+class WriteBehindQueue:
+    """Journaled in-process batching of inserts"""
+
+    def __init__(self, db, journal_dir: Path, enabled: bool = True):
+        self.db = db
+        self.journal_dir = journal_dir
+        self.enabled = enabled
+        self._pending: List[Tuple[str, dict]] = []
+        # Failed attempts so far, by id() of the pending document
+        self._attempts: Dict[int, int] = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._journal = None
+        self._journal_path = None
+        self._closing = False
+        self._on_flush: List[Callable[[str, List[dict]], Awaitable]] = []
+
+    def on_flush(self, callback: Callable[[str, List[dict]], Awaitable]):
+        """Register `await callback(collection, docs)` to run with each batch of newly inserted docs"""
+        self._on_flush.append(callback)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def start(self):
+        if not self.enabled:
+            return
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        path = self.journal_dir / f"writes-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl"
+        # Lock before the name becomes visible to other workers' recovery
+        staging = path.with_suffix(".new")
+        journal = open(staging, "a", encoding="utf-8")
+        fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        os.replace(staging, path)
+        self._journal = journal
+        self._journal_path = path
+        self._recover()
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, collection: str, doc: dict):
+        """Journal a document for insertion; it is durable when this returns"""
+        if not self.enabled:
+            await self.db[collection].insert_one(doc)
+            for callback in self._on_flush:
+                await callback(collection, [doc])
+            return
+
+        if self._closing or self._journal is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is shutting down, please try again"
+            )
+        if len(self._pending) >= WRITE_QUEUE_MAX:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again",
+                headers={"Retry-After": "1"},
+            )
+
+        line = json_util.dumps({"c": collection, "d": doc}) + "\n"
+        if len(line) > WRITE_MAX_DOCUMENT_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Submission is too large"
+            )
+        self._append([line], [(collection, doc)])
+        if len(self._pending) >= WRITE_BATCH_SIZE:
+            self._wakeup.set()
+
+    def _append(self, lines: List[str], entries: List[Tuple[str, dict]]):
+        """Journal entries, then queue them"""
+        self._journal.writelines(lines)
+        self._journal.flush()
+        if WRITE_JOURNAL_FSYNC:
+            os.fsync(self._journal.fileno())
+        self._pending.extend(entries)
+
+    async def _run(self):
+        failures = 0
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=WRITE_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            if self._pending:
+                try:
+                    await self._flush()
+                    failures = 0
+                except Exception:
+                    failures += 1
+                    logger.exception("Write-behind flush failed (%d pending)", len(self._pending))
+                    await asyncio.sleep(min(WRITE_FLUSH_INTERVAL * 2 ** failures, MAX_RETRY_DELAY))
+                    continue
+
+            if self._closing and not self._pending:
+                return
+
+    async def _flush(self):
+        batch = self._pending[:WRITE_QUEUE_MAX]
+        by_collection: Dict[str, List[dict]] = {}
+        for collection, doc in batch:
+            by_collection.setdefault(collection, []).append(doc)
+
+        done = set()  # id() of docs that are in Mongo or dead-lettered
+        try:
+            for collection, docs in by_collection.items():
+                for start in range(0, len(docs), WRITE_BATCH_SIZE):
+                    chunk = docs[start:start + WRITE_BATCH_SIZE]
+                    inserted, failed = await self._insert(collection, chunk)
+                    for index, doc in enumerate(chunk):
+                        if index not in failed:
+                            done.add(id(doc))
+                            self._attempts.pop(id(doc), None)
+                            continue
+                        attempts = self._attempts.get(id(doc), 0) + 1
+                        if attempts < WRITE_MAX_ATTEMPTS:
+                            self._attempts[id(doc)] = attempts
+                            continue
+                        self._dead_letter(collection, doc, failed[index])
+                        done.add(id(doc))
+                        self._attempts.pop(id(doc), None)
+                    # Per chunk, so a later chunk failing cannot lose these from the counters
+                    for callback in self._on_flush:
+                        await callback(collection, inserted)
+        finally:
+            if done:
+                # Submissions only append, so the batch is still the head of the queue
+                self._pending[:len(batch)] = [entry for entry in batch if id(entry[1]) not in done]
+                self._rewrite_journal()
+
+    async def _insert(self, collection: str, docs: List[dict]) -> Tuple[List[dict], Dict[int, str]]:
+        """Insert one chunk; returns the inserted docs and {index: error} of rejected ones.
+
+        Connection failures are raised, so the whole batch is retried later.
+        """
+        try:
+            await self.db[collection].insert_many(docs, ordered=False)
+            return docs, {}
+        except BulkWriteError as exc:
+            return _split_write_errors(docs, exc)
+        except ConnectionFailure:
+            raise
+        except Exception as exc:
+            # e.g. DocumentTooLarge/InvalidDocument, raised before anything is
+            # sent: find the offending documents by inserting one at a time
+            logger.warning("Inserting %d %s failed (%s); retrying one by one", len(docs), collection, exc)
+
+        inserted, failed = [], {}
+        for index, doc in enumerate(docs):
+            try:
+                await self.db[collection].insert_one(doc)
+                inserted.append(doc)
+            except DuplicateKeyError:
+                pass
+            except ConnectionFailure:
+                raise
+            except Exception as exc:
+                failed[index] = f"{type(exc).__name__}: {exc}"
+        return inserted, failed
+
+    def _rewrite_journal(self):
+        """Replace the journal with the entries still pending"""
+        if not self._pending:
+            self._journal.truncate(0)
+            self._journal.seek(0)
+            return
+        # Same swap as in start(): the new file is locked before it takes the name
+        staging = self._journal_path.with_suffix(".new")
+        journal = open(staging, "w", encoding="utf-8")
+        fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        journal.writelines(json_util.dumps({"c": collection, "d": doc}) + "\n" for collection, doc in self._pending)
+        journal.flush()
+        if WRITE_JOURNAL_FSYNC:
+            os.fsync(journal.fileno())
+        os.replace(staging, self._journal_path)
+        self._journal.close()
+        self._journal = journal
+
+    def _dead_letter(self, collection: str, doc: dict, error: str):
+        logger.error("Giving up on %s document %s: %s", collection, doc.get("id"), error)
+        with open(self.journal_dir / DEAD_LETTER_FILE, "a", encoding="utf-8") as dead:
+            dead.write(json_util.dumps({"c": collection, "d": doc, "error": error}) + "\n")
+
+    def _recover(self):
+        """Adopt journals left by workers that are no longer running.
+
+        Their entries are appended to this worker's journal and queue before
+        the old file is removed, so nothing is lost if this worker dies too.
+        """
+        for path in sorted(self.journal_dir.glob("writes-*.jsonl")):
+            if path == self._journal_path:
+                continue
+            with open(path, "r+", encoding="utf-8") as journal:
+                try:
+                    fcntl.flock(journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # owned by a live worker
+
+                lines, entries = [], []
+                for line in journal:
+                    try:
+                        entry = json_util.loads(line)
+                    except ValueError:
+                        logger.warning("Skipping torn journal line in %s", path.name)
+                        continue
+                    lines.append(line if line.endswith("\n") else line + "\n")
+                    entries.append((entry["c"], entry["d"]))
+                self._append(lines, entries)
+                logger.info("Adopted %d journaled writes from %s", len(entries), path.name)
+                path.unlink()
+
+    async def close(self):
+        """Stop accepting submissions and drain the queue into Mongo.
+
+        If Mongo stays unreachable past WRITE_DRAIN_TIMEOUT the journal is
+        kept, and the next worker to start adopts it.
+        """
+        self._closing = True
+        if self._task is not None:
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._task, timeout=WRITE_DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.error("Write-behind drain timed out; %d left in journal", len(self._pending))
+        if self._journal is not None:
+            drained = not self._pending
+            self._journal.close()
+            self._journal = None
+            if drained:
+                self._journal_path.unlink(missing_ok=True)
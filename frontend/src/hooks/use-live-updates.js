@@ -0,0 +1,79 @@
+import { useEffect, useRef } from "react"
+import { useAuth } from "../context/AuthContext"
+
+const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+const MAX_RETRY_DELAY = 30000
+
+// Parse one "event: ...\ndata: ..." block from the stream
+function parseEvent(block) {
+  let data = ""
+  for (const line of block.split("\n")) {
+    if (line.startsWith("data:")) {
+      data += line.slice(5).trim()
+    }
+  }
+  return data ? JSON.parse(data) : null
+}
+
+/**
+ * Subscribe to GET /api/admin/live and call onEvent for each update.
+ *
+ * Uses fetch rather than EventSource so the bearer token travels in a
+ * header instead of the URL. Reconnects with backoff and sends a
+ * { type: "resync" } event after each reconnect, since updates may have
+ * been missed while disconnected.
+ */
+export function useLiveUpdates(onEvent) {
+  const { getAuthHeader } = useAuth()
+  const handler = useRef(onEvent)
+  handler.current = onEvent
+
+  useEffect(() => {
+    const controller = new AbortController()
+    let retryDelay = 1000
+    let connectedBefore = false
+
+    const connect = async () => {
+      while (!controller.signal.aborted) {
+        try {
+          const response = await fetch(`${API}/admin/live`, {
+            headers: getAuthHeader(),
+            signal: controller.signal
+          })
+          if (!response.ok) {
+            throw new Error(`Live updates unavailable (${response.status})`)
+          }
+          if (connectedBefore) {
+            handler.current({ type: "resync" })
+          }
+          connectedBefore = true
+          retryDelay = 1000
+
+          const reader = response.body.getReader()
+          const decoder = new TextDecoder()
+          let buffer = ""
+          for (;;) {
+            const { value, done } = await reader.read()
+            if (done) break
+            buffer += decoder.decode(value, { stream: true })
+            let boundary
+            while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+              const event = parseEvent(buffer.slice(0, boundary))
+              buffer = buffer.slice(boundary + 2)
+              if (event) handler.current(event)
+            }
+          }
+        } catch (error) {
+          if (controller.signal.aborted) return
+          console.error("Live updates disconnected:", error)
+        }
+        await new Promise((resolve) => setTimeout(resolve, retryDelay))
+        retryDelay = Math.min(retryDelay * 2, MAX_RETRY_DELAY)
+      }
+    }
+
+    connect()
+    return () => controller.abort()
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [])
+}
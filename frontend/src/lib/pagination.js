@@ -0,0 +1,22 @@
+import axios from "axios"
+
+/**
+ * GET one keyset page of a paginated list endpoint.
+ *
+ * `config` is passed to axios (e.g. auth headers); `after` is the cursor
+ * from the previous page. Resolves to `{ items, total, next }`, where
+ * `total` comes from X-Total-Count and `next` from X-Next-Cursor (absent
+ * on the last page).
+ */
+export async function fetchPage(url, config = {}, after) {
+  const response = await axios.get(url, {
+    ...config,
+    params: { ...config.params, ...(after ? { after } : {}) }
+  })
+  const total = Number(response.headers["x-total-count"])
+  return {
+    items: response.data,
+    total: Number.isNaN(total) ? response.data.length : total,
+    next: response.headers["x-next-cursor"] || null
+  }
+}
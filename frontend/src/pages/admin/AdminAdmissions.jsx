@@ -7,7 +7,9 @@ import { CheckCircle, XCircle, Clock, Search } from 'lucide-react';
 import { Input } from '../../components/ui/input';
 import { useToast } from '../../hooks/use-toast';
 import axios from 'axios';
+import { fetchPage } from '../../lib/pagination';
 import { useAuth } from '../../context/AuthContext';
+import { useLiveUpdates } from '../../hooks/use-live-updates';
 import {
   Dialog,
   DialogContent,
@@ -22,6 +24,8 @@ const AdminAdmissions = () => {
   const { getAuthHeader } = useAuth();
   const { toast } = useToast();
   const [admissions, setAdmissions] = useState([]);
+  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState('');
   const [selectedAdmission, setSelectedAdmission] = useState(null);
@@ -31,12 +35,31 @@ const AdminAdmissions = () => {
     fetchAdmissions();
   }, []);
 
-  const fetchAdmissions = async () => {
+  useLiveUpdates((event) => {
+    if (event.type === 'admission.created') {
+      setAdmissions((prev) =>
+        prev.some((a) => a.id === event.doc.id) ? prev : [event.doc, ...prev]
+      );
+      setTotal((count) => count + 1);
+    } else if (event.type === 'admission.updated') {
+      setAdmissions((prev) =>
+        prev.map((a) => (a.id === event.doc.id ? { ...a, ...event.doc } : a))
+      );
+      setSelectedAdmission((prev) =>
+        prev && prev.id === event.doc.id ? { ...prev, ...event.doc } : prev
+      );
+    } else if (event.type === 'resync') {
+      fetchAdmissions();
+    }
+  });
+
+  const fetchAdmissions = async (after) => {
     try {
-      const response = await axios.get(`${API}/admissions`, {
-        headers: getAuthHeader()
-      });
-      setAdmissions(response.data);
+      const page = await fetchPage(`${API}/admissions`, { headers: getAuthHeader() }, after);
+      // A cursor appends the next page; without one the list starts over
+      setAdmissions((prev) => (after ? [...prev, ...page.items] : page.items));
+      setTotal(page.total);
+      setNextCursor(page.next);
     } catch (error) {
       toast({
         title: 'Error',
@@ -98,7 +121,7 @@ const AdminAdmissions = () => {
             <div className="flex items-center justify-between">
               <div>
                 <CardTitle>All Applications</CardTitle>
-                <CardDescription>{admissions.length} total applications</CardDescription>
+                <CardDescription>{total} total applications</CardDescription>
               </div>
               <div className="w-72">
                 <div className="relative">
@@ -173,6 +196,13 @@ const AdminAdmissions = () => {
                 </Table>
               </div>
             )}
+            {!loading && nextCursor && (
+              <div className="flex justify-center mt-6">
+                <Button variant="outline" onClick={() => fetchAdmissions(nextCursor)}>
+                  Load more
+                </Button>
+              </div>
+            )}
           </CardContent>
         </Card>
       </div>
@@ -8,6 +8,7 @@ import { Textarea } from '../../components/ui/textarea';
 import { Trash2, Plus, Edit, Bell } from 'lucide-react';
 import { useToast } from '../../hooks/use-toast';
 import axios from 'axios';
+import { fetchPage } from '../../lib/pagination';
 import { useAuth } from '../../context/AuthContext';
 import {
   Dialog,
@@ -25,6 +26,8 @@ const AdminAnnouncements = () => {
   const { getAuthHeader } = useAuth();
   const { toast } = useToast();
   const [announcements, setAnnouncements] = useState([]);
+  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [dialogOpen, setDialogOpen] = useState(false);
   const [editMode, setEditMode] = useState(false);
@@ -40,10 +43,13 @@ const AdminAnnouncements = () => {
     fetchAnnouncements();
   }, []);
 
-  const fetchAnnouncements = async () => {
+  const fetchAnnouncements = async (after) => {
     try {
-      const response = await axios.get(`${API}/announcements`);
-      setAnnouncements(response.data);
+      const page = await fetchPage(`${API}/announcements`, {}, after);
+      // A cursor appends the next page; without one the list starts over
+      setAnnouncements((prev) => (after ? [...prev, ...page.items] : page.items));
+      setTotal(page.total);
+      setNextCursor(page.next);
     } catch (error) {
       toast({
         title: 'Error',
@@ -214,7 +220,7 @@ const AdminAnnouncements = () => {
         <Card>
           <CardHeader>
             <CardTitle>All Announcements</CardTitle>
-            <CardDescription>{announcements.length} total announcements</CardDescription>
+            <CardDescription>{total} total announcements</CardDescription>
           </CardHeader>
           <CardContent>
             {loading ? (
@@ -285,6 +291,13 @@ const AdminAnnouncements = () => {
                 </Button>
               </div>
             )}
+            {!loading && nextCursor && (
+              <div className="flex justify-center mt-6">
+                <Button variant="outline" onClick={() => fetchAnnouncements(nextCursor)}>
+                  Load more
+                </Button>
+              </div>
+            )}
           </CardContent>
         </Card>
       </div>
@@ -6,7 +6,7 @@ import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '.
 import { Mail, Search, Eye } from 'lucide-react';
 import { Input } from '../../components/ui/input';
 import { useToast } from '../../hooks/use-toast';
-import axios from 'axios';
+import { fetchPage } from '../../lib/pagination';
 import { useAuth } from '../../context/AuthContext';
 import {
   Dialog,
@@ -22,6 +22,8 @@ const AdminContacts = () => {
   const { getAuthHeader } = useAuth();
   const { toast } = useToast();
   const [contacts, setContacts] = useState([]);
+  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState('');
   const [selectedContact, setSelectedContact] = useState(null);
@@ -31,12 +33,13 @@ const AdminContacts = () => {
     fetchContacts();
   }, []);
 
-  const fetchContacts = async () => {
+  const fetchContacts = async (after) => {
     try {
-      const response = await axios.get(`${API}/contact`, {
-        headers: getAuthHeader()
-      });
-      setContacts(response.data);
+      const page = await fetchPage(`${API}/contact`, { headers: getAuthHeader() }, after);
+      // A cursor appends the next page; without one the list starts over
+      setContacts((prev) => (after ? [...prev, ...page.items] : page.items));
+      setTotal(page.total);
+      setNextCursor(page.next);
     } catch (error) {
       toast({
         title: 'Error',
@@ -67,7 +70,7 @@ const AdminContacts = () => {
             <div className="flex items-center justify-between">
               <div>
                 <CardTitle>All Messages</CardTitle>
-                <CardDescription>{contacts.length} total messages</CardDescription>
+                <CardDescription>{total} total messages</CardDescription>
               </div>
               <div className="w-72">
                 <div className="relative">
@@ -137,6 +140,13 @@ const AdminContacts = () => {
                 </Table>
               </div>
             )}
+            {!loading && nextCursor && (
+              <div className="flex justify-center mt-6">
+                <Button variant="outline" onClick={() => fetchContacts(nextCursor)}>
+                  Load more
+                </Button>
+              </div>
+            )}
           </CardContent>
         </Card>
       </div>
@@ -1,9 +1,10 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import AdminLayout from '../../components/AdminLayout';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '../../components/ui/card';
 import { Users, FileText, Mail, Image, TrendingUp, Clock } from 'lucide-react';
 import axios from 'axios';
 import { useAuth } from '../../context/AuthContext';
+import { useLiveUpdates } from '../../hooks/use-live-updates';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
@@ -11,11 +12,30 @@ const AdminDashboard = () => {
   const { getAuthHeader } = useAuth();
   const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(true);
+  const refetchTimer = useRef(null);
 
   useEffect(() => {
     fetchStats();
+    return () => clearTimeout(refetchTimer.current);
   }, []);
 
+  // New submissions adjust the counts in place; anything else (status
+  // changes, resyncs) triggers one debounced reload of the stats
+  useLiveUpdates((event) => {
+    if (event.type === 'admission.created') {
+      setStats((prev) => prev && {
+        ...prev,
+        total_admissions: prev.total_admissions + 1,
+        pending_admissions: prev.pending_admissions + (event.doc.status === 'pending' ? 1 : 0)
+      });
+    } else if (event.type === 'contact.created') {
+      setStats((prev) => prev && { ...prev, total_contacts: prev.total_contacts + 1 });
+    } else if (event.type === 'admission.updated' || event.type === 'resync') {
+      clearTimeout(refetchTimer.current);
+      refetchTimer.current = setTimeout(fetchStats, 1000);
+    }
+  });
+
   const fetchStats = async () => {
     try {
       const response = await axios.get(`${API}/admin/dashboard`, {
@@ -7,6 +7,7 @@ import { Label } from '../../components/ui/label';
 import { Trash2, Plus, Image as ImageIcon } from 'lucide-react';
 import { useToast } from '../../hooks/use-toast';
 import axios from 'axios';
+import { fetchPage } from '../../lib/pagination';
 import { useAuth } from '../../context/AuthContext';
 import {
   Dialog,
@@ -23,6 +24,8 @@ const AdminGallery = () => {
   const { getAuthHeader } = useAuth();
   const { toast } = useToast();
   const [images, setImages] = useState([]);
+  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [dialogOpen, setDialogOpen] = useState(false);
   const [formData, setFormData] = useState({
@@ -35,10 +38,13 @@ const AdminGallery = () => {
     fetchImages();
   }, []);
 
-  const fetchImages = async () => {
+  const fetchImages = async (after) => {
     try {
-      const response = await axios.get(`${API}/gallery`);
-      setImages(response.data);
+      const page = await fetchPage(`${API}/gallery`, {}, after);
+      // A cursor appends the next page; without one the list starts over
+      setImages((prev) => (after ? [...prev, ...page.items] : page.items));
+      setTotal(page.total);
+      setNextCursor(page.next);
     } catch (error) {
       toast({
         title: 'Error',
@@ -160,7 +166,7 @@ const AdminGallery = () => {
         <Card>
           <CardHeader>
             <CardTitle>Gallery Images</CardTitle>
-            <CardDescription>{images.length} total images</CardDescription>
+            <CardDescription>{total} total images</CardDescription>
           </CardHeader>
           <CardContent>
             {loading ? (
@@ -207,6 +213,13 @@ const AdminGallery = () => {
                 </Button>
               </div>
             )}
+            {!loading && nextCursor && (
+              <div className="flex justify-center mt-6">
+                <Button variant="outline" onClick={() => fetchImages(nextCursor)}>
+                  Load more
+                </Button>
+              </div>
+            )}
           </CardContent>
         </Card>
       </div>
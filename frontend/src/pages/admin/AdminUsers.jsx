@@ -7,6 +7,7 @@ import { Trash2, Search } from 'lucide-react';
 import { Input } from '../../components/ui/input';
 import { useToast } from '../../hooks/use-toast';
 import axios from 'axios';
+import { fetchPage } from '../../lib/pagination';
 import { useAuth } from '../../context/AuthContext';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
@@ -15,6 +16,8 @@ const AdminUsers = () => {
   const { getAuthHeader } = useAuth();
   const { toast } = useToast();
   const [users, setUsers] = useState([]);
+  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState('');
 
@@ -22,12 +25,13 @@ const AdminUsers = () => {
     fetchUsers();
   }, []);
 
-  const fetchUsers = async () => {
+  const fetchUsers = async (after) => {
     try {
-      const response = await axios.get(`${API}/admin/users`, {
-        headers: getAuthHeader()
-      });
-      setUsers(response.data);
+      const page = await fetchPage(`${API}/admin/users`, { headers: getAuthHeader() }, after);
+      // A cursor appends the next page; without one the list starts over
+      setUsers((prev) => (after ? [...prev, ...page.items] : page.items));
+      setTotal(page.total);
+      setNextCursor(page.next);
     } catch (error) {
       toast({
         title: 'Error',
@@ -78,7 +82,7 @@ const AdminUsers = () => {
             <div className="flex items-center justify-between">
               <div>
                 <CardTitle>All Users</CardTitle>
-                <CardDescription>{users.length} total users</CardDescription>
+                <CardDescription>{total} total users</CardDescription>
               </div>
               <div className="w-72">
                 <div className="relative">
@@ -148,6 +152,13 @@ const AdminUsers = () => {
                 </Table>
               </div>
             )}
+            {!loading && nextCursor && (
+              <div className="flex justify-center mt-6">
+                <Button variant="outline" onClick={() => fetchUsers(nextCursor)}>
+                  Load more
+                </Button>
+              </div>
+            )}
           </CardContent>
         </Card>
       </div>
@@ -0,0 +1,51 @@
+"""Archival round trip: restored documents stay in the hot collection."""
+import asyncio
+from datetime import datetime, timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+from archive import archive_name, restore, run_archival
+
+
+def _old_admission(admission_id: str) -> dict:
+    return {
+        "id": admission_id,
+        "status": "approved",
+        "submitted_at": datetime.utcnow() - timedelta(days=800),
+    }
+
+
+def test_restored_documents_are_not_archived_again():
+    async def run():
+        db = AsyncMongoMockClient()["archive_restored"]
+        await db.admissions.insert_many([_old_admission("a"), _old_admission("b")])
+
+        # One owner across runs, as the Archiver uses
+        moved = await run_archival(db, "worker")
+        assert moved["admissions"] == 2
+        assert await db.admissions.count_documents({}) == 0
+
+        assert await restore(db, "admissions", {"id": "a"}) == 1
+        restored = await db.admissions.find_one({"id": "a"})
+        assert "restored_at" in restored and "archived_at" not in restored
+
+        moved = await run_archival(db, "worker")
+        assert moved["admissions"] == 0
+        assert await db.admissions.count_documents({"id": "a"}) == 1
+        assert await db[archive_name("admissions")].count_documents({}) == 1
+
+    asyncio.run(run())
+
+
+def test_restore_counts_only_documents_it_put_back():
+    async def run():
+        db = AsyncMongoMockClient()["archive_restore_count"]
+        await db.admissions.create_index("id", unique=True)
+        await db.admissions.insert_one(_old_admission("a"))
+        # Left in both tiers by a restore that died between its two steps
+        await db[archive_name("admissions")].insert_many([_old_admission("a"), _old_admission("b")])
+
+        assert await restore(db, "admissions", {}) == 1
+        assert await db[archive_name("admissions")].count_documents({}) == 0
+
+    asyncio.run(run())
@@ -0,0 +1,80 @@
+"""Bulk admin writes racing a concurrent request."""
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from bulk import bulk_delete, bulk_update_status
+from models import AdmissionBulkStatusUpdate
+
+
+class RacedCollection:
+    """Runs `concurrent` against the real collection just before the bulk write"""
+
+    def __init__(self, collection, concurrent):
+        self.collection = collection
+        self.concurrent = concurrent
+
+    def find(self, *args, **kwargs):
+        return self.collection.find(*args, **kwargs)
+
+    async def bulk_write(self, operations, **kwargs):
+        await self.concurrent(self.collection)
+        return await self.collection.bulk_write(operations, **kwargs)
+
+    async def delete_many(self, query):
+        await self.concurrent(self.collection)
+        return await self.collection.delete_many(query)
+
+
+def _admissions():
+    return [{"id": admission_id, "status": "pending"} for admission_id in ("a", "b", "c")]
+
+
+def _request(*ids):
+    return AdmissionBulkStatusUpdate(updates=[{"id": admission_id, "status": "approved"} for admission_id in ids])
+
+
+def test_uncontended_update_reports_every_transition():
+    async def run():
+        admissions = AsyncMongoMockClient()["bulk_uncontended"].admissions
+        await admissions.insert_many(_admissions())
+        return await bulk_update_status(admissions, _request("a", "b"))
+
+    result, transitions = asyncio.run(run())
+    assert result.modified == 2
+    assert sorted(t["id"] for t in transitions) == ["a", "b"]
+
+
+def test_update_racing_another_writer_leaves_transitions_to_a_recount():
+    async def run():
+        admissions = AsyncMongoMockClient()["bulk_update_race"].admissions
+        await admissions.insert_many(_admissions())
+
+        async def concurrent(collection):
+            # A single-item PUT approves b and rejects c in between our read and write
+            await collection.update_one({"id": "b"}, {"$set": {"status": "approved"}})
+            await collection.update_one({"id": "c"}, {"$set": {"status": "rejected"}})
+
+        return await bulk_update_status(RacedCollection(admissions, concurrent), _request("a", "b", "c"))
+
+    result, transitions = asyncio.run(run())
+    assert result.modified == 1
+    # The PUT already counted b; reporting it here too would move it twice
+    assert transitions == []
+    outcomes = {item.id: item.result for item in result.results}
+    assert outcomes["c"] == "conflict"
+
+
+def test_delete_racing_another_delete_reports_fewer_modified_than_matched():
+    async def run():
+        users = AsyncMongoMockClient()["bulk_delete_race"].users
+        await users.insert_many([{"id": user_id, "email": f"{user_id}@x"} for user_id in ("a", "b")])
+
+        async def concurrent(collection):
+            await collection.delete_one({"id": "a"})
+
+        return await bulk_delete(RacedCollection(users, concurrent), ["a", "b"], fields=("email",))
+
+    result, deleted = asyncio.run(run())
+    assert result.modified == 1
+    assert len(deleted) == 2  # both are gone, but only one was deleted by this call
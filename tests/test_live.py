@@ -0,0 +1,25 @@
+"""Live feed: auto mode falls back to polling when change streams cannot open."""
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+import live
+from live import LiveFeed
+
+
+def test_auto_mode_polls_when_watch_cannot_open(monkeypatch):
+    monkeypatch.setattr(live, "LIVE_POLL_INTERVAL", 0.01)
+
+    async def run():
+        feed = LiveFeed(AsyncMongoMockClient()["live_fallback"], mode="auto")
+        feed.start()
+        try:
+            for _ in range(100):
+                if feed.mode is not None:
+                    break
+                await asyncio.sleep(0.01)
+            assert feed.mode == "poll"
+        finally:
+            await feed.close()
+
+    asyncio.run(run())
@@ -0,0 +1,187 @@
+"""Write-behind queue: poison documents, dead-lettering and journal adoption."""
+import asyncio
+
+import pytest
+from bson import json_util
+from fastapi import HTTPException
+from pymongo.errors import BulkWriteError, DocumentTooLarge, DuplicateKeyError, ServerSelectionTimeoutError
+
+import write_queue
+from write_queue import DEAD_LETTER_FILE, WriteBehindQueue
+
+
+class FakeCollection:
+    """insert_many/insert_one with Mongo's error behaviour for `id` clashes and poison documents"""
+
+    def __init__(self, db):
+        self.db = db
+        self.docs = {}
+
+    def _check(self, doc):
+        if self.db.down:
+            raise ServerSelectionTimeoutError("no servers")
+        if doc.get("poison") == "too_large":
+            raise DocumentTooLarge("document too large")
+
+    async def insert_many(self, docs, ordered=False):
+        for doc in docs:
+            self._check(doc)  # raised client-side, before anything is written
+        errors = []
+        for index, doc in enumerate(docs):
+            if doc.get("poison") == "invalid":
+                errors.append({"index": index, "code": 121, "errmsg": "Document failed validation"})
+            elif doc["id"] in self.docs:
+                errors.append({"index": index, "code": 11000, "errmsg": "duplicate key"})
+            else:
+                self.docs[doc["id"]] = doc
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    async def insert_one(self, doc):
+        self._check(doc)
+        if doc.get("poison") == "invalid":
+            raise BulkWriteError({"writeErrors": [{"index": 0, "code": 121, "errmsg": "Document failed validation"}]})
+        if doc["id"] in self.docs:
+            raise DuplicateKeyError("duplicate key")
+        self.docs[doc["id"]] = doc
+
+
+class FakeDb(dict):
+    down = False
+
+    def __missing__(self, name):
+        self[name] = FakeCollection(self)
+        return self[name]
+
+
+@pytest.fixture(autouse=True)
+def fast_queue(monkeypatch):
+    monkeypatch.setattr(write_queue, "WRITE_FLUSH_INTERVAL", 0.001)
+    monkeypatch.setattr(write_queue, "MAX_RETRY_DELAY", 0.01)
+    monkeypatch.setattr(write_queue, "WRITE_MAX_ATTEMPTS", 3)
+
+
+async def _drained(queue, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while queue.pending and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.005)
+    return not queue.pending
+
+
+def _dead_letters(journal_dir):
+    path = journal_dir / DEAD_LETTER_FILE
+    if not path.exists():
+        return []
+    return [json_util.loads(line) for line in path.read_text().splitlines()]
+
+
+@pytest.mark.parametrize("poison", ["too_large", "invalid"])
+def test_poison_document_is_dead_lettered_without_blocking_the_queue(tmp_path, poison):
+    async def run():
+        db = FakeDb()
+        flushed = []
+        queue = WriteBehindQueue(db, tmp_path)
+
+        async def on_flush(collection, docs):
+            flushed.extend(doc["id"] for doc in docs)
+
+        queue.on_flush(on_flush)
+        await queue.start()
+        await queue.submit("contacts", {"id": "a"})
+        await queue.submit("contacts", {"id": "bad", "poison": poison})
+        await queue.submit("contacts", {"id": "b"})
+        assert await _drained(queue)
+        await queue.submit("contacts", {"id": "c"})
+        assert await _drained(queue)
+        await queue.close()
+        return db, flushed
+
+    db, flushed = asyncio.run(run())
+    assert sorted(db["contacts"].docs) == ["a", "b", "c"]
+    assert sorted(flushed) == ["a", "b", "c"]
+    dead = _dead_letters(tmp_path)
+    assert [entry["d"]["id"] for entry in dead] == ["bad"]
+    assert dead[0]["c"] == "contacts"
+    assert not list(tmp_path.glob("writes-*.jsonl"))
+
+
+def test_connection_failure_keeps_documents_queued(tmp_path):
+    async def run():
+        db = FakeDb()
+        db.down = True
+        queue = WriteBehindQueue(db, tmp_path)
+        await queue.start()
+        await queue.submit("contacts", {"id": "a"})
+        await asyncio.sleep(0.1)
+        assert queue.pending == 1  # retried, never dead-lettered
+        db.down = False
+        assert await _drained(queue)
+        await queue.close()
+        return db
+
+    db = asyncio.run(run())
+    assert list(db["contacts"].docs) == ["a"]
+    assert _dead_letters(tmp_path) == []
+
+
+def test_oversized_submission_is_refused_before_journaling(tmp_path, monkeypatch):
+    monkeypatch.setattr(write_queue, "WRITE_MAX_DOCUMENT_BYTES", 1024)
+
+    async def run():
+        queue = WriteBehindQueue(FakeDb(), tmp_path)
+        await queue.start()
+        with pytest.raises(HTTPException) as refused:
+            await queue.submit("contacts", {"id": "a", "message": "x" * 2048})
+        assert queue.pending == 0
+        assert queue._journal_path.read_text() == ""
+        await queue.close()
+        return refused.value
+
+    assert asyncio.run(run()).status_code == 413
+
+
+def test_orphaned_journal_is_adopted_even_while_mongo_is_down(tmp_path):
+    orphan = tmp_path / "writes-1-deadbeef.jsonl"
+    orphan.write_text(
+        json_util.dumps({"c": "admissions", "d": {"id": "a"}}) + "\n"
+        + json_util.dumps({"c": "admissions", "d": {"id": "b"}}) + "\n"
+        + '{"c": "admissions", "d": {"id": "to'  # torn by the crash
+    )
+
+    async def run():
+        db = FakeDb()
+        db.down = True
+        queue = WriteBehindQueue(db, tmp_path)
+        await queue.start()  # must not fail while Mongo is unreachable
+        assert queue.pending == 2
+        assert not orphan.exists()
+        adopted = [json_util.loads(line)["d"]["id"] for line in queue._journal_path.read_text().splitlines()]
+        assert adopted == ["a", "b"]
+
+        db.down = False
+        assert await _drained(queue)
+        await queue.close()
+        return db
+
+    db = asyncio.run(run())
+    assert sorted(db["admissions"].docs) == ["a", "b"]
+
+
+def test_journal_is_compacted_to_what_is_still_pending(tmp_path):
+    async def run():
+        db = FakeDb()
+        queue = WriteBehindQueue(db, tmp_path)
+        await queue.start()
+        await queue.submit("contacts", {"id": "a"})
+        await queue.submit("contacts", {"id": "bad", "poison": "invalid"})
+        # After the first flush only the failing document is left in the journal
+        deadline = asyncio.get_running_loop().time() + 2
+        while "a" not in db["contacts"].docs and asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0)
+        remaining = [json_util.loads(line)["d"]["id"] for line in queue._journal_path.read_text().splitlines()]
+        assert "a" not in remaining
+        assert await _drained(queue)
+        await queue.close()
+
+    asyncio.run(run())